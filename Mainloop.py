@@ -2,19 +2,19 @@
 # FSAE Current Racing Torsion Rig Main Loop and GUI
 import VL53L1Xcode
 import BNO055onUART
-import dataLogger.py
+import dataLogger
 import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
 MAX_LOAD = 20000  #pounds
 WARNING_LOAD = 1700 #pounds
-TOF_CHANNELS = 8
+TOF_CHANNELS = VL53L1Xcode.ch      # stations from topology.py
 TOF_ZEROS = [0] * TOF_CHANNELS
 PITCHZERO = 0
 forceData = []
-tofs = [[] for i in range(8)]
-filename = dataLogger.createUniqueFilename(["Force_lb", "ToF1_deg", "ToF2_deg", "ToF3_deg", "ToF4_deg", "ToF5_deg", "ToF6_deg", "ToF7_deg", "ToF8_deg", "Gyro_Pitch_deg"])
+tofs = [[] for i in range(TOF_CHANNELS)]
+filename = dataLogger.createUniqueFilename(["Force_lb"] + [f"ToF{i+1}_deg" for i in range(TOF_CHANNELS)] + ["Gyro_Pitch_deg"])
 
 def getZeros(t=False, b=False):
     global TOF_ZEROS
@@ -79,7 +79,7 @@ ax = f.add_subplot(111)
 ax.set_xlabel("Force (lb)")
 ax.set_ylabel("Angle (deg)")
 ax.grid(True)
-lines = [ax.plot([], [], label=f"ToF{i+1}", marker='o')[0] for i in range(8)]
+lines = [ax.plot([], [], label=f"ToF{i+1}", marker='o')[0] for i in range(TOF_CHANNELS)]
 ax.legend()
 
 canvas = FigureCanvasTkAgg(f, master=root)
@@ -5,6 +5,7 @@ import busio
 import adafruit_tca9548a
 from adafruit_vl53l1x import VL53L1X
 import numpy as np
+from tof_scheduler import ToFScheduler
 
 i2c = busio.I2C(board.SCL, board.SDA) # uses board.SCL and board.SDA
 tca = adafruit_tca9548a.TCA9548A(i2c)
@@ -20,11 +21,11 @@ values = np.array([[0, 0, 0, 0, 0, 0, 0, 0],
 ch = 8
 adj = 100 #cm
 theta = [None] * ch
+sched = ToFScheduler(ch, target_hz=20.0)
 for i in range(ch):
     try:
         tof[i] = VL53L1X(tca[i])
-        tof[i].start_ranging()
-        tof[i].timing_budget = 500
+        sched.apply(i, tof[i])
         print(tof[i], "At position", i)
     except:
         pass
@@ -54,10 +55,13 @@ while True:
             try:
                 values[i][j] = tof[i].distance
                 tof[i].clear_interrupt()
+                if sched.update(i, float(values[i][j])):
+                    sched.apply(i, tof[i])
             except:
                 pass
-        time.sleep(tof[0].timing_budget * .001)
+        time.sleep(max(c.budget_ms for c in sched.ch) * .001)
     print(values)
+    print(sched.report())
     for i in range(ch):
         try:
             theta[i] = math.degrees(math.acos(adj/(np.mean(values[i]))))
@@ -2,52 +2,45 @@
 # FSAE Current Racing Torsion Rig VL53L1X ToF Sensors
 import os, time, math
 os.environ["BLINKA_I2C"] = "13"   # ensure this is set before importing board/busio
-import board
-import busio
-import adafruit_tca9548a
-from adafruit_vl53l1x import VL53L1X
 import numpy as np
+from tof_scheduler import ToFScheduler
+from topology import load_topology, open_channels
 
-i2c = busio.I2C(board.SCL, board.SDA) # uses board.SCL and board.SDA
-tca = adafruit_tca9548a.TCA9548A(i2c)
-tof = [None] * 8
+topo = load_topology()          # buses/muxes/channels; default is one TCA9548A with 8 channels
+ch = len(topo)
+tof = [None] * ch
+_opened = False                 # sensors are opened on the first getAngles(), not at import
 
 def test():
     print("Starting test...")
     return
 
-values = np.array([[0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0],
-                   [0, 0, 0, 0, 0, 0, 0, 0]])
-ch = 8
-adj = np.array([[100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100],
-                [100, 100, 100, 100, 100, 100, 100, 100]])  # adjust array to calibrate initial distance
+PASSES = 8                      # readings averaged per angle
+values = np.zeros((ch, PASSES))
+adj = np.full((ch, PASSES), 100)  # adjust array to calibrate initial distance
 theta = [0] * ch
-for i in range(ch):
-    try:
-        tof[i] = VL53L1X(tca[i])
-        tof[i].start_ranging()
-        tof[i].timing_budget = 500
-        # print(tof[i], "At position", i)
-    except:
-        pass
+sched = ToFScheduler(ch, target_hz=20.0)   # same rate as sensors.TARGET_HZ
+
+def openSensors():
+    global _opened
+    from adafruit_vl53l1x import VL53L1X
+    channels = open_channels(topo)
+    for i in range(ch):
+        try:
+            tof[i] = VL53L1X(channels[i])
+            sched.apply(i, tof[i])
+            # print(tof[i], "At position", i)
+        except:
+            pass
+    _opened = True
     
 #print("Timing Budget: {}".format(tof[0].timing_budget))
 
     
 def getAngles(first=False): # returns list of angles from each ToF sensor
-    for j in range(8):
+    if not _opened:
+        openSensors()
+    for j in range(PASSES):
         for i in range(ch):
             try:
                 if first == True:   # on first run, calibrate initial distance to zero the sensors
@@ -57,9 +50,11 @@ def getAngles(first=False): # returns list of angles from each ToF sensor
                 else:
                     values[i][j] = tof[i].distance  # get distance readings for hypotenuse
                     tof[i].clear_interrupt()
+                    if sched.update(i, float(values[i][j])):
+                        sched.apply(i, tof[i])
             except:
                 pass
-        time.sleep(tof[0].timing_budget * .001)
+        time.sleep(max(c.budget_ms for c in sched.ch) * .001)   # wait for the slowest channel
     # print(values)
     for i in range(ch):
         try:
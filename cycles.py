@@ -0,0 +1,159 @@
+# cycles.py
+# Online load-cycle segmentation over the torque/angle stream.
+# A cycle starts when torque leaves the start band and ends when it comes back under the end
+# level (or when unloading turns into loading again before that). Inside a cycle the phase is
+# loading / hold / unloading from the smoothed torque rate, debounced by min_phase_s.
+# Per cycle: peak torque, loading and unloading stiffness (Nm/deg), hysteresis loop area (J),
+# residual set (deg, zero-torque angle after vs before). Running sums only -- memory does not grow with cycle length.
+
+import math
+from collections import deque
+
+from rig_math import LineFit, torque_nm
+
+IDLE, LOADING, HOLD, UNLOADING = "idle", "loading", "hold", "unloading"
+
+
+class _Cycle:
+    def __init__(self, n, t, torque, angle):
+        self.n = n
+        self.t0, self.torque0, self.angle0 = t, torque, angle
+        self.peak, self.t_peak, self.angle_peak = torque, t, angle
+        self.load_fit, self.unload_fit = LineFit(), LineFit()
+        self.area = 0.0                 # closed-path integral of torque d(angle), J
+        self.work_in = 0.0              # work done while loading, J
+        self.phase_s = {LOADING: 0.0, HOLD: 0.0, UNLOADING: 0.0}
+
+
+class CycleSegmenter:
+    def __init__(self, arm_length_m=0.25, start_nm=50.0, end_nm=25.0, rate_nm_s=15.0, tau_s=0.5,
+                 min_phase_s=0.3, min_peak_nm=100.0):
+        self.arm_length_m = float(arm_length_m)
+        self.start_nm, self.end_nm = float(start_nm), float(end_nm)
+        self.rate_nm_s = float(rate_nm_s)
+        self.tau_s = float(tau_s)
+        self.min_phase_s = float(min_phase_s)
+        self.min_peak_nm = float(min_peak_nm)   # smaller excursions are dropped as noise
+
+        self.phase = IDLE
+        self.cycles = 0                 # completed cycles emitted
+        self.rate = 0.0                 # smoothed dT/dt, Nm/s
+        self._events = deque()
+        self._cycle = None
+        self._t = self._torque = self._angle = None
+        self._smooth = None
+        self._cand, self._cand_t = None, None
+
+    # --- feeding ---
+    def on_sample(self, s):
+        """SensorReader listener (force in lbf, selected angle in degrees)."""
+        self.update(s["t"], torque_nm(s["force_lbs"], self.arm_length_m), float(s["angle_deg"]))
+
+    def update(self, t, torque, angle_deg):
+        prev_t, prev_T, prev_a = self._t, self._torque, self._angle
+        self._t, self._torque, self._angle = t, torque, angle_deg
+        if prev_t is None or t <= prev_t:
+            self._smooth = torque
+            return
+        dt = t - prev_t
+        a = 1.0 - math.exp(-dt / self.tau_s)
+        smooth_prev = self._smooth
+        self._smooth += a * (torque - self._smooth)
+        self.rate += a * ((self._smooth - smooth_prev) / dt - self.rate)
+
+        c = self._cycle
+        if c is None:
+            if torque >= self.start_nm:
+                self._begin(t, torque, angle_deg)
+            return
+
+        # integrate over the step just taken
+        c.phase_s[self.phase] += dt
+        work = 0.5 * (torque + prev_T) * math.radians(angle_deg - prev_a)
+        c.area += work
+        if self.phase == LOADING:
+            c.work_in += work
+            c.load_fit.add(angle_deg, torque)
+        elif self.phase == UNLOADING:
+            c.unload_fit.add(angle_deg, torque)
+        if torque > c.peak:
+            c.peak, c.t_peak, c.angle_peak = torque, t, angle_deg
+
+        if torque < self.end_nm:
+            self._end(t, torque, angle_deg, "unloaded")
+            return
+        new = self._classify(t)
+        if new is not None and new != self.phase:
+            if self.phase == UNLOADING and new == LOADING:
+                # reloaded before returning to zero: close this cycle, open the next here
+                self._end(t, torque, angle_deg, "reloaded")
+                self._begin(t, torque, angle_deg)
+            else:
+                self._set_phase(new, t, torque, angle_deg)
+
+    def close(self):
+        """Emit the cycle in progress (marked incomplete) at end of session."""
+        if self._cycle is not None:
+            self._end(self._t, self._torque, self._angle, "session_end")
+
+    def pop_events(self):
+        out = []
+        while self._events:
+            out.append(self._events.popleft())
+        return out
+
+    # --- internals ---
+    def _classify(self, t):
+        """Debounced phase from the smoothed rate; None until a candidate has held min_phase_s."""
+        if self.rate > self.rate_nm_s:
+            cand = LOADING
+        elif self.rate < -self.rate_nm_s:
+            cand = UNLOADING
+        else:
+            cand = HOLD
+        if cand != self._cand:
+            self._cand, self._cand_t = cand, t
+        return cand if t - self._cand_t >= self.min_phase_s else None
+
+    def _begin(self, t, torque, angle):
+        self._cycle = _Cycle(self.cycles + 1, t, torque, angle)
+        self.phase = LOADING
+        self._cand, self._cand_t = LOADING, t
+
+    def _set_phase(self, phase, t, torque, angle):
+        self.phase = phase
+        c = self._cycle
+        if c.peak >= self.min_peak_nm:
+            self._events.append(("CyclePhase", {"cycle": c.n, "phase": phase, "t_s": round(t - c.t0, 2),
+                                                "torque_nm": round(torque, 2), "angle_deg": round(angle, 4)}))
+
+    def _end(self, t, torque, angle, reason):
+        c, self._cycle = self._cycle, None
+        self.phase = IDLE
+        if c.peak < self.min_peak_nm:
+            return
+        self.cycles += 1
+        k_load, k_unload = c.load_fit.slope(), c.unload_fit.slope()
+        # set = zero-torque angle after minus before: before from the loading fit, after from the
+        # unloading fit; without a fit, back off the start/end crossing along that branch's stiffness
+        a0 = c.load_fit.x_at(0.0)
+        if a0 is None:
+            k = k_load or k_unload
+            a0 = c.angle0 - c.torque0 / k if k else c.angle0
+        a1 = c.unload_fit.x_at(0.0)
+        if a1 is None:
+            k = k_unload or k_load
+            a1 = angle - torque / k if k else angle
+        self._events.append(("Cycle", {
+            "cycle": c.n, "end": reason, "complete": reason == "unloaded",
+            "duration_s": round(t - c.t0, 2),
+            "loading_s": round(c.phase_s[LOADING], 2), "hold_s": round(c.phase_s[HOLD], 2),
+            "unloading_s": round(c.phase_s[UNLOADING], 2),
+            "peak_torque_nm": round(c.peak, 2), "peak_angle_deg": round(c.angle_peak, 4),
+            "t_peak_s": round(c.t_peak - c.t0, 2),
+            "k_loading_nm_deg": round(k_load, 3) if k_load is not None else "",
+            "k_unloading_nm_deg": round(k_unload, 3) if k_unload is not None else "",
+            "hysteresis_j": round(c.area, 4),
+            "loss_ratio": round(c.area / c.work_in, 4) if c.work_in > 1e-9 else "",
+            "residual_set_deg": round(a1 - a0, 4) if reason != "session_end" else "",
+            "start_torque_nm": round(c.torque0, 2), "end_torque_nm": round(torque, 2)}))
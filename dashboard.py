@@ -1,7 +1,7 @@
 # dashboard.py
-# UI: force gauge, BNO pitch label, 8× ToF plot, Start/Stop/Zero, XML logging.
+# UI: force gauge, BNO pitch label, N× ToF plot (see topology.py), Start/Stop/Zero, XML logging.
 
-import os, csv, xml.etree.ElementTree as ET
+import os, signal, threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 import matplotlib
@@ -10,45 +10,37 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 
-from xml_logger import XMLLogger
-from sensors import SensorReader, ARM_LENGTH_M
+from xml_logger import XMLLogger, sample_record, export_xml_to_csv, LOG_MAX_SAMPLES, LOG_MAX_BYTES
+from sensors import SensorReader, UPDATE_MS
+from log_writer import LogWriter
+from triggers import TriggerCapture, ForceThreshold, ForceSlope, AngleJump, SensorDropout
+from profiler import SamplingProfiler
+from cycles import CycleSegmenter
+from rig_math import ARM_LENGTH_M, torque_nm
 
 # ===== CONFIG =====
 MAX_FORCE_LBS = 2000
 WARNING_FORCE = 1700
-UPDATE_MS = 200
 WINDOW_POINTS = 120
 APPLY_ZERO_DISPLAY = True
+REPLAY_SEEK_S = 10.0            # Left/Right in replay mode
+PROFILE_S = 10.0                # <p> or SIGUSR1: sample Tk + sensor threads for this long
+PROFILE_INTERVAL_S = 0.005
+LOG_QUEUE_MAX = 2000            # samples/events waiting for the writer thread
+LOG_OVERFLOW = "drop_oldest"    # drop_oldest | drop_newest | block
+LOG_FLUSH_S = 1.0               # writer batches at most this long before flushing
+CAPTURE_PRE_S = 3.0             # full-rate data kept before a trigger
+CAPTURE_POST_S = 3.0            # ...and recorded after it
+SLOPE_TRIGGER_LBS_S = 3000
+ANGLE_JUMP_DEG = 5.0
+DROPOUT_TIMEOUT_S = 1.0
+CYCLE_START_NM = 50.0           # torque that opens a load cycle...
+CYCLE_END_NM = 25.0             # ...and the level it has to come back under
 # ==================
 
-# ----- XML → CSV -----
-def export_xml_to_csv(xml_path: str) -> str:
-    tree = ET.parse(xml_path); root = tree.getroot()
-    samples = root.findall(".//Sample")
-    fields, rows = set(), []
-    for s in samples:
-        row = {}
-        def add(prefix, elem):
-            for c in elem:
-                tag = f"{prefix}.{c.tag}" if prefix else c.tag
-                if len(c):
-                    add(tag, c)
-                else:
-                    row[tag] = (c.text or "").strip(); fields.add(tag)
-        add("", s)
-        row["timestamp"] = s.attrib.get("t", "")
-        rows.append(row)
-    fieldnames = ["timestamp"] + sorted(fields)
-    base, _ = os.path.splitext(xml_path)
-    csv_path = f"{base}.csv"
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames); w.writeheader(); w.writerows(rows)
-    return csv_path
-
-
 # ===== MAIN UI =====
 class FSAE_Dashboard:
-    def __init__(self, root):
+    def __init__(self, root, sensors=None, logger=None, autotick=True, replay=None):
         # state
         self.root = root
         self.root.title("FSAE Telemetry Dashboard — Pi")
@@ -59,16 +51,46 @@ class FSAE_Dashboard:
         self.torque_zero = 0.0
         self.last_raw = (0.0, 0.0, 0.0)
 
+        self.profiler = None              # created on first <p>/SIGUSR1
+
+        # replay: a ReplaySource stands in for the sensors and nothing is logged
+        self.replay = replay
+        if replay:
+            self.root.title(f"FSAE Telemetry Dashboard — Replay {os.path.basename(replay.path)}")
+
+        # sensors
+        self.sensors = replay or sensors or SensorReader(target_hz=20.0)
+        self.num_sensors = len(self.sensors.angles_tof_deg)
+        topo = getattr(self.sensors, "topology", None)
+        tof_desc = topo.describe() if topo else f"{self.num_sensors}x ToF"
+
         # logger (auto-saves under 'xml files/')
-        self.logger = XMLLogger(
+        self.logger = None if replay else logger or XMLLogger(
             path="torsion_session.xml",
-            session_meta={"rig": "FSAE Torsion Rig", "mode": "8x ToF + BNO055"},
-            rotate_daily=True
+            session_meta={"rig": "FSAE Torsion Rig", "mode": f"{tof_desc} + BNO055",
+                          "stations": ",".join(repr(st) for st in topo.stations) if topo else self.num_sensors},
+            rotate_daily=True,
+            max_samples=LOG_MAX_SAMPLES,
+            max_bytes=LOG_MAX_BYTES
         )
-        self.logger.flush_every = 1
+        # the Tk thread only enqueues; a writer thread batches into the XML
+        self.log = LogWriter(self.logger, maxsize=LOG_QUEUE_MAX, policy=LOG_OVERFLOW,
+                             flush_interval_s=LOG_FLUSH_S) if self.logger else None
 
-        # sensors
-        self.sensors = SensorReader(target_hz=20.0)
+        # dense capture around overloads/glitches (written under 'xml files/captures/')
+        self.capture = None if replay else TriggerCapture(
+            self.sensors,
+            [ForceThreshold(WARNING_FORCE), ForceSlope(SLOPE_TRIGGER_LBS_S),
+             AngleJump(ANGLE_JUMP_DEG), SensorDropout(DROPOUT_TIMEOUT_S)],
+            out_dir=os.path.join(os.path.dirname(self.logger.path), "captures"),
+            session_name=os.path.splitext(os.path.basename(self.logger.path))[0],
+            pre_s=CAPTURE_PRE_S, post_s=CAPTURE_POST_S
+        )
+
+        # load/hold/unload segmentation at acquisition rate; one "Cycle" event per cycle
+        self.cycles = None if replay else CycleSegmenter(ARM_LENGTH_M, start_nm=CYCLE_START_NM, end_nm=CYCLE_END_NM)
+        if self.cycles:
+            self.sensors.add_listener(self.cycles.on_sample)
 
         # top bar
         frame_top = ttk.Frame(root); frame_top.pack(fill="x", padx=10, pady=(10,6))
@@ -94,8 +116,8 @@ class FSAE_Dashboard:
         self.gauge_canvas = FigureCanvasTkAgg(self.gauge_fig, master=root)
         self.gauge_canvas.get_tk_widget().pack(fill="x", padx=10, pady=(0,10))
 
-        # plot: torque vs 8x angle
-        frame_bottom = ttk.LabelFrame(root, text="Torque vs Angle — All ToF Sensors (S1…S8)")
+        # plot: torque vs angle, one line per ToF station
+        frame_bottom = ttk.LabelFrame(root, text=f"Torque vs Angle — All ToF Sensors (S1…S{self.num_sensors})")
         frame_bottom.pack(fill="both", expand=True, padx=10, pady=(0,10))
         self.fig = Figure(figsize=(7.6, 4.6), dpi=100, facecolor="#1e1e1e")
         self.ax = self.fig.add_subplot(111)
@@ -107,7 +129,6 @@ class FSAE_Dashboard:
         self.canvas = FigureCanvasTkAgg(self.fig, master=frame_bottom)
         self.canvas.get_tk_widget().pack(fill="both", expand=True)
 
-        self.num_sensors = len(self.sensors.angles_tof_deg)
         self.ang_bufs = [[] for _ in range(self.num_sensors)]
         self.tor_bufs = [[] for _ in range(self.num_sensors)]
         self.lines = []
@@ -121,10 +142,22 @@ class FSAE_Dashboard:
         bar = ttk.Frame(root); bar.pack(fill="x", padx=10, pady=(0,10))
         self.status = tk.StringVar(value="Samples: 0")
         ttk.Label(bar, textvariable=self.status).pack(side="left")
-        ttk.Label(bar, text=f"XML: {self.logger.path}").pack(side="right")
+        self.health_lbl = tk.Label(bar, text="", font=("Consolas", 10), fg="white", bg="#2e7d32", padx=6)
+        if getattr(self.sensors, "health", None):
+            self.health_lbl.pack(side="left", padx=10)
+        ttk.Label(bar, text=f"XML: {self.logger.path}" if self.logger else f"Replay: {replay.path}").pack(side="right")
         self.root.bind("<space>", lambda e: self.on_start() if not self.running else self.on_stop())
         self.root.bind("<z>", lambda e: self.on_zero())
-        self.root.after(UPDATE_MS, self.tick)
+        self.root.bind("<p>", lambda e: self.on_profile())
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda *_: self.root.after_idle(self.on_profile))
+        if replay:
+            self.root.bind("<Left>",  lambda e: self.on_seek(-REPLAY_SEEK_S))
+            self.root.bind("<Right>", lambda e: self.on_seek(+REPLAY_SEEK_S))
+            self.root.bind("<Home>",  lambda e: self.on_seek(None))
+        self.autotick = autotick          # False: caller drives tick() (soak/replay)
+        if autotick:
+            self.root.after(UPDATE_MS, self.tick)
         self.root.protocol("WM_DELETE_WINDOW", self.on_quit)
         self._refresh_buttons()
 
@@ -137,12 +170,54 @@ class FSAE_Dashboard:
             self.btn_start.state(["!disabled"]); self.btn_stop.state(["disabled"])
             self.state_var.set("PAUSED"); self.state_lbl.configure(bg="#9e9e9e")
 
-    def on_start(self): self.running = True;  self._refresh_buttons()
+    def on_start(self):
+        self.running = True; self._refresh_buttons()
+        if self.replay:
+            if self.replay.done(): self.replay.seek(0.0)
+            self.replay.resync(); self.replay.reset_fps()
     def on_stop(self):  self.running = False; self._refresh_buttons()
     def on_zero(self):
         f, a, t = self.last_raw
         self.force_zero, self.angle_zero, self.torque_zero = f, a, t
-        self.logger.add_event("Zero")
+        if self.log:
+            self.log.add_event("Zero")
+
+    def on_profile(self):
+        """Start (or cut short) a sampling profile; output goes next to the session log."""
+        if self.profiler is None:
+            src = self.logger.path if self.logger else self.replay.path
+            self.profiler = SamplingProfiler(os.path.dirname(os.path.abspath(src)),
+                                             prefix="profile_" + os.path.splitext(os.path.basename(src))[0],
+                                             interval_s=PROFILE_INTERVAL_S, on_done=self._profile_done)
+        threads = {"tk": threading.main_thread(), "sensors": getattr(self.sensors, "_th", None),
+                   "log-writer": getattr(self.log, "_th", None)}
+        for th in getattr(self.sensors, "_bus_threads", []):
+            threads[th.name] = th
+        if self.profiler.toggle(threads, PROFILE_S):
+            self.state_var.set("PROFILING"); self.state_lbl.configure(bg="#6a1b9a")
+
+    def _profile_done(self, path, samples):
+        # sampler thread: LogWriter is thread-safe, Tk is not (tick() resets the label)
+        if self.log:
+            self.log.add_event("Profile", {"file": os.path.basename(path), "samples": samples,
+                                           "interval_s": PROFILE_INTERVAL_S})
+        print(f"[profile] {samples} samples -> {path}")
+
+    def on_seek(self, delta_s):
+        """Replay only: jump by delta_s seconds (None = back to the start)."""
+        self.replay.seek(0.0 if delta_s is None else self.replay.t + delta_s)
+        for i in range(self.num_sensors):
+            self.ang_bufs[i].clear(); self.tor_bufs[i].clear()
+
+    def _refresh_health(self):
+        h = self.sensors.health
+        tof = h.counts(self.sensors.topology.names())
+        states = h.states()
+        self.health_lbl.config(text=f"ToF {tof['ok']} ok / {tof['degraded']} degraded / {tof['dead']} dead"
+                                    f"   HX {states['HX711']}   BNO {states['BNO055']}")
+        bad = [n for n, st in states.items() if st != "ok"]
+        dead = [n for n in bad if states[n] == "dead"]
+        self.health_lbl.config(bg="#c62828" if dead else "#f9a825" if bad else "#2e7d32")
 
     # gauge
     def _setup_gauge(self):
@@ -160,10 +235,30 @@ class FSAE_Dashboard:
     # main loop
     def tick(self):
         try:
+            if self.capture:
+                for etype, meta in self.capture.pop_events():
+                    self.log.add_event(etype, meta)
+            if self.cycles:
+                for etype, meta in self.cycles.pop_events():
+                    self.log.add_event(etype, meta)
+            if self.log:
+                for change in self.sensors.tof_sched.pop_changes():
+                    self.log.add_event("ToFTiming", change)
+                for change in self.sensors.health.pop_events():
+                    self.log.add_event("SensorHealth", change)
+                self._refresh_health()
+
+            if self.profiler and not self.profiler.running and self.state_var.get() == "PROFILING":
+                self._refresh_buttons()
+
+            if self.running and self.replay and not self.replay.step():
+                self.on_stop()
+                self._replay_report()
+
             if self.running:
                 rf = float(self.sensors.force_lbs)
                 ra = float(self.sensors.angle_deg)                 # selected angle (BNO or avg ToF)
-                rt = rf * 4.448 * float(ARM_LENGTH_M)              # torque
+                rt = torque_nm(rf, ARM_LENGTH_M)                   # torque
                 self.last_raw = (rf, ra, rt)
 
                 if APPLY_ZERO_DISPLAY:
@@ -197,40 +292,67 @@ class FSAE_Dashboard:
                 self.ax.relim(); self.ax.autoscale_view()
                 self.canvas.draw_idle()
 
-                self.logger.add_sample({
-                    "Raw": {
-                        "Force_lbs": round(rf, 2),
-                        "Angle_deg_selected": round(ra, 3),
-                        "Torque_Nm": round(rt, 3)
-                    },
-                    "Angles": {
-                        "ToF_deg": {f"S{i+1}": round(val, 3) for i, val in enumerate(tof_angles)},
-                        "BNO055": {
-                            "roll_deg":  round(float(bno.get("roll",  0.0)), 3),
-                            "pitch_deg": round(float(bno.get("pitch", 0.0)), 3),
-                            "yaw_deg":   round(float(bno.get("yaw",   0.0)), 3),
-                        }
-                    },
-                    "Display": {
-                        "Force_lbs": round(df, 2),
-                        "Angle_deg": round(da, 3),
-                        "Torque_Nm": round(dt, 3)
-                    }
-                })
-                self.logger.flush()
+                if self.log:
+                    self.log.add_sample(sample_record((rf, ra, rt), tof_angles, bno, (df, da, dt),
+                                                      self.sensors.t_step))
 
                 self.sample_count += 1
-                self.status.set(f"Samples: {self.sample_count}")
+                if self.replay:
+                    if self.replay.speed is None:
+                        self.root.update_idletasks()       # render every frame so fps is real
+                    self.status.set(f"Replay {self.replay.t:7.1f}/{self.replay.duration:.1f} s  "
+                                    f"frame {self.replay.pos}/{len(self.replay.frames)}  {self.replay.fps():5.1f} fps")
+                else:
+                    st, acq = self.log.stats(), self.sensors.rate.stats()
+                    self.status.set(f"Samples: {self.sample_count}   cycle {self.cycles.cycles} {self.cycles.phase}"
+                                    f"   acq late p99 {acq['late_p99_ms']:.1f} ms missed {acq['missed']}"
+                                    f"   log queue {st['depth']} (max {st['max_depth']})"
+                                    f"  dropped {st['dropped']}  write {st['last_write_ms']:.0f}/{st['max_write_ms']:.0f} ms")
 
         finally:
-            self.root.after(UPDATE_MS, self.tick)
+            if self.autotick:
+                delay = self.replay.delay_ms() if self.replay and self.running else UPDATE_MS
+                self.root.after(delay, self.tick)
+
+    def _replay_report(self):
+        r = self.replay
+        speed = "max" if r.speed is None else f"{r.speed:g}x"
+        msg = f"Replay done: {r.rendered} frames at {r.fps():.1f} fps ({speed})"
+        print(msg)
+        self.status.set(msg)
 
     # closing
     def on_quit(self):
         try: self.sensors.stop()
         except: pass
+        if self.replay:
+            self.root.destroy()
+            return
+        try: self.log.add_event("ToFReport", {r.pop("channel"): r for r in self.sensors.tof_sched.report()})
+        except: pass
+        try: self.log.add_event("AcqTiming", self.sensors.timing())
+        except: pass
+        try:
+            self.capture.close()
+            for etype, meta in self.capture.pop_events():
+                self.log.add_event(etype, meta)
+        except: pass
+        try:
+            self.sensors.remove_listener(self.cycles.on_sample)
+            self.cycles.close()                   # a cycle cut off by quitting is still logged
+            for etype, meta in self.cycles.pop_events():
+                self.log.add_event(etype, meta)
+        except: pass
+        try:
+            self.log.add_event("LogWriter", self.log.stats())
+            self.log.close()                      # drain whatever is still queued
+        except: pass
         try: self.logger.close()
         except: pass
+        try:
+            from session_catalog import catalog_session      # sqlite only needed at the very end
+            catalog_session(self.logger.path)
+        except: pass
         try:
             csv_file = export_xml_to_csv(self.logger.path)
             messagebox.showinfo("Saved", f"CSV saved:\n{csv_file}")
@@ -240,11 +362,29 @@ class FSAE_Dashboard:
 
 
 # run
+#   python dashboard.py                                   live rig
+#   python dashboard.py --replay "xml files/torsion_session_20261019-143005.xml" --speed 4
+#   python dashboard.py --replay "xml files/torsion_session_20261019-143005.xml" --from 720 --to 840   (index-backed window)
+#   python dashboard.py --replay Data/10-01-2025_14-02-11.csv --speed max   (rendering benchmark)
 if __name__ == "__main__":
+    import argparse
+    from replay import ReplaySource
+    ap = argparse.ArgumentParser(description="FSAE torsion rig dashboard")
+    ap.add_argument("--replay", metavar="SESSION", help="XML session or CSV to play back instead of the rig")
+    ap.add_argument("--speed", default="1", help="playback speed multiplier, or 'max'")
+    ap.add_argument("--period", type=float, default=UPDATE_MS / 1000.0, help="sample spacing for CSVs without timestamps")
+    ap.add_argument("--from", dest="t_from", type=float, help="replay from this many seconds into the session")
+    ap.add_argument("--to", dest="t_to", type=float, help="...up to this many seconds")
+    args = ap.parse_args()
+
     root = tk.Tk()
     try: ttk.Style().theme_use("clam")
     except: pass
-    app = FSAE_Dashboard(root)
+    replay = None
+    if args.replay:
+        span = (args.t_from, args.t_to) if args.t_from is not None or args.t_to is not None else None
+        replay = ReplaySource(args.replay, None if args.speed == "max" else float(args.speed), args.period, span)
+    app = FSAE_Dashboard(root, replay=replay)
     root.mainloop()
 
 
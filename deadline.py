@@ -0,0 +1,78 @@
+# deadline.py
+# Fixed-rate loop timing against absolute monotonic deadlines (t0 + k*period), so read time
+# and sleep overshoot don't stretch the period or accumulate as drift.
+# On overrun (a deadline passed before the loop got back to wait()):
+#   skip     -- drop the deadlines already missed, run the most recent one now (late < 1 period)
+#   catch_up -- run the missed deadlines back to back (at most max_catch_up), then resume
+# Lateness (actual - scheduled) and work time are kept for the last few thousand ticks.
+
+import time
+from collections import deque
+
+POLICIES = ("skip", "catch_up")
+
+
+def percentile(vals, q):
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+class DeadlineScheduler:
+    def __init__(self, rate_hz, policy="skip", clock=time.monotonic, max_catch_up=5, window=2048):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.period = 1.0 / float(rate_hz)
+        self.policy = policy
+        self.max_catch_up = int(max_catch_up)
+        self._clock = clock
+        self._next = None               # next deadline
+        self._started = None            # start of the tick in progress (for work time)
+
+        self.ticks = 0
+        self.missed = 0                 # deadlines dropped without a tick
+        self.overruns = 0               # waits entered after the deadline (loop behind schedule)
+        self.max_late_ms = 0.0
+        self._late = deque(maxlen=window)
+        self._work = deque(maxlen=window)
+
+    def wait(self, stop=None):
+        """Block until the next deadline; returns it (the scheduled time), or None once `stop` is set."""
+        now = self._clock()
+        if self._started is not None:
+            self._work.append(now - self._started)
+        if self._next is None:
+            self._next = now
+        elif now > self._next:
+            self.overruns += 1
+            behind = int((now - self._next) / self.period)
+            drop = behind if self.policy == "skip" else max(0, behind - self.max_catch_up)
+            if drop:
+                self._next += drop * self.period
+                self.missed += drop
+        while now < self._next:
+            if stop is not None:
+                if stop.wait(self._next - now):
+                    return None
+            else:
+                time.sleep(self._next - now)
+            now = self._clock()
+        if stop is not None and stop.is_set():
+            return None
+        sched = self._next
+        self._next += self.period
+        self._started = now
+        late = now - sched
+        self._late.append(late)
+        self.ticks += 1
+        self.max_late_ms = max(self.max_late_ms, late * 1e3)
+        return sched
+
+    def stats(self) -> dict:
+        late, work = list(self._late), list(self._work)
+        return {"rate_hz": round(1.0 / self.period, 3), "policy": self.policy, "ticks": self.ticks,
+                "missed": self.missed, "overruns": self.overruns,
+                "late_mean_ms": round(sum(late) / len(late) * 1e3, 3) if late else 0.0,
+                "late_p99_ms": round(percentile(late, 0.99) * 1e3, 3), "late_max_ms": round(self.max_late_ms, 3),
+                "work_p99_ms": round(percentile(work, 0.99) * 1e3, 3)}
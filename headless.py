@@ -0,0 +1,118 @@
+# headless.py
+# Unattended logging: SensorReader -> LogWriter -> XMLLogger, no tkinter/matplotlib/numpy.
+# Every acquisition sample (or every Nth) is logged from the sensor thread; Ctrl-C or
+# SIGTERM stops cleanly. Startup is timed so boot-to-first-sample can be checked.
+#   python headless.py --duration 3600 --log-every 1
+
+import time
+T_START = time.monotonic()          # before any other import, for time-to-first-sample
+
+import sys, signal, argparse, threading
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless torsion rig logger")
+    ap.add_argument("--hz", type=float, help="acquisition rate (default sensors.TARGET_HZ)")
+    ap.add_argument("--policy", choices=("skip", "catch_up"), help="on overrun (default sensors.RATE_POLICY)")
+    ap.add_argument("--log-every", type=int, default=1, help="log every Nth acquisition sample")
+    ap.add_argument("--duration", type=float, help="stop after this many seconds (default: until Ctrl-C)")
+    ap.add_argument("--path", default="torsion_headless.xml", help="session file name under 'xml files/' (start time is appended)")
+    ap.add_argument("--topology", help="topology JSON (default: topology.py lookup)")
+    ap.add_argument("--export-csv", action="store_true", help="write the CSV export on exit")
+    ap.add_argument("--no-catalog", action="store_true", help="skip the session catalog update on exit")
+    a = ap.parse_args(argv)
+    if a.log_every < 1:
+        ap.error("--log-every must be at least 1")
+
+    # heavy/hardware imports only once we know we are really running
+    t_imp = time.monotonic()
+    import sensors
+    from sensors import SensorReader
+    from topology import load_topology
+    from xml_logger import XMLLogger, sample_record, LOG_MAX_SAMPLES, LOG_MAX_BYTES
+    from log_writer import LogWriter
+    from cycles import CycleSegmenter
+    from rig_math import ARM_LENGTH_M, torque_nm
+    t_imported = time.monotonic()
+
+    topo = load_topology(a.topology)
+    hz = a.hz or sensors.TARGET_HZ
+    logger = XMLLogger(a.path, session_meta={"rig": "FSAE Torsion Rig", "mode": f"headless {topo.describe()} + BNO055",
+                                             "rate_hz": hz, "log_every": a.log_every},
+                       rotate_daily=True, max_samples=LOG_MAX_SAMPLES, max_bytes=LOG_MAX_BYTES)
+    log = LogWriter(logger)
+    cycles = CycleSegmenter(ARM_LENGTH_M)
+
+    first = {}
+    count = [0]
+    def on_sample(s):
+        count[0] += 1
+        if not first:
+            first["t"] = time.monotonic()
+        cycles.on_sample(s)
+        for etype, meta in cycles.pop_events():
+            log.add_event(etype, meta)
+        if count[0] % a.log_every:
+            return
+        rf = float(s["force_lbs"]); ra = float(s["angle_deg"]); rt = torque_nm(rf, ARM_LENGTH_M)
+        log.add_sample(sample_record((rf, ra, rt), s["tof_deg"], s["bno"], (rf, ra, rt), (s["t_sched"], s["t"])))
+
+    t_sens = time.monotonic()
+    reader = SensorReader(target_hz=hz, topology=topo, start=False, policy=a.policy or sensors.RATE_POLICY)
+    reader.add_listener(on_sample)
+    t_ready = time.monotonic()
+    reader.start()
+
+    done = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: done.set())
+
+    while not first and not done.wait(0.001):
+        pass
+    if first:
+        startup = {"imports_ms": round((t_imported - t_imp) * 1e3, 1),
+                   "sensor_init_ms": round((t_ready - t_sens) * 1e3, 1),
+                   "first_sample_ms": round((first["t"] - T_START) * 1e3, 1)}
+        log.add_event("Startup", startup)
+        print(f"[headless] first sample {startup['first_sample_ms']:.0f} ms after start "
+              f"(imports {startup['imports_ms']:.0f} ms, sensor init {startup['sensor_init_ms']:.0f} ms) -> {logger.path}")
+
+    def drain():
+        # same events dashboard.tick() moves into the log; also keeps the reader's deques short
+        for change in reader.tof_sched.pop_changes():
+            log.add_event("ToFTiming", change)
+        for change in reader.health.pop_events():
+            log.add_event("SensorHealth", change)
+
+    t_run = time.monotonic()
+    while not done.wait(5.0 if a.duration is None else min(5.0, max(0.0, t_run + a.duration - time.monotonic()))):
+        if a.duration is not None and time.monotonic() - t_run >= a.duration:
+            break
+        drain()
+        st, acq = log.stats(), reader.rate.stats()
+        print(f"[headless] {count[0]} samples, cycle {cycles.cycles} {cycles.phase}, late p99 {acq['late_p99_ms']:.1f} ms, "
+              f"missed {acq['missed']}, queue {st['depth']}, dropped {st['dropped']}, write {st['last_write_ms']:.0f} ms")
+
+    reader.stop()
+    drain()
+    log.add_event("ToFReport", {r.pop("channel"): r for r in reader.tof_sched.report()})
+    cycles.close()
+    for etype, meta in cycles.pop_events():
+        log.add_event(etype, meta)
+    elapsed = max(1e-9, time.monotonic() - t_run)
+    log.add_event("AcqTiming", reader.timing())
+    log.add_event("Stop", {"samples": count[0], "rate_hz": round(count[0] / elapsed, 2), **log.stats()})
+    log.close()
+    logger.close()
+    if not a.no_catalog:
+        from session_catalog import catalog_session
+        catalog_session(logger.path)
+    if a.export_csv:
+        from xml_logger import export_xml_to_csv
+        print(f"[headless] CSV: {export_xml_to_csv(logger.path)}")
+    print(f"[headless] {count[0]} samples in {elapsed:.1f} s ({count[0] / elapsed:.1f} Hz)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
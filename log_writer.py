@@ -0,0 +1,129 @@
+# log_writer.py
+# Bounded queue + writer thread in front of XMLLogger so the Tk loop never touches the disk.
+# The UI enqueues samples/events (timestamped at enqueue); the writer batches them into the
+# logger and flushes once per batch. Overflow policy: drop_oldest | drop_newest | block.
+
+import time, threading
+from collections import deque
+
+POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class LogWriter:
+    def __init__(self, logger, maxsize=2000, policy="drop_oldest", batch_max=250, flush_interval_s=1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.logger = logger
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self.batch_max = int(batch_max)
+        self.flush_interval_s = float(flush_interval_s)
+        logger.flush_every = 0                  # flushing is ours now
+
+        self._q = deque()
+        self._cv = threading.Condition()
+        self._closing = False
+        self._first_pending = None
+
+        # counters (read with stats())
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_write_ms = 0.0
+        self.max_write_ms = 0.0
+        self._write_ms_total = 0.0
+        self.errors = 0
+
+        self._th = threading.Thread(target=self._run, daemon=True, name="log-writer")
+        self._th.start()
+
+    # --- producer side (any thread) ---
+    def add_sample(self, data: dict):
+        self._put(("sample", self.logger._now(), data, None))
+
+    def add_event(self, etype: str, meta: dict | None = None):
+        self._put(("event", self.logger._now(), etype, meta))
+
+    def _put(self, item):
+        with self._cv:
+            if self._closing:
+                return
+            if len(self._q) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return
+                if self.policy == "drop_oldest":
+                    self._q.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._q) >= self.maxsize and not self._closing:
+                        self._cv.wait()
+            self._q.append(item)
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._q))
+            if self._first_pending is None:
+                self._first_pending = time.monotonic()
+                self._cv.notify_all()           # writer may be idle in an untimed wait: start its flush clock
+            elif len(self._q) >= self.batch_max:
+                self._cv.notify_all()
+
+    @property
+    def depth(self):
+        return len(self._q)
+
+    def stats(self) -> dict:
+        return {"depth": len(self._q), "max_depth": self.max_depth, "enqueued": self.enqueued,
+                "written": self.written, "dropped": self.dropped, "batches": self.batches,
+                "last_write_ms": round(self.last_write_ms, 2), "max_write_ms": round(self.max_write_ms, 2),
+                "avg_write_ms": round(self._write_ms_total / self.batches, 2) if self.batches else 0.0,
+                "errors": self.errors}
+
+    def close(self, timeout=None):
+        """Stop accepting, write everything still queued, flush."""
+        with self._cv:
+            self._closing = True
+            self._cv.notify_all()
+        self._th.join(timeout)
+
+    # --- writer thread ---
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._closing:
+                    if len(self._q) >= self.batch_max:
+                        break
+                    if self._first_pending is not None:
+                        left = self._first_pending + self.flush_interval_s - time.monotonic()
+                        if left <= 0:
+                            break
+                        self._cv.wait(left)
+                    else:
+                        self._cv.wait()
+                if not self._q and self._closing:
+                    return
+                batch = [self._q.popleft() for _ in range(min(self.batch_max, len(self._q)))]
+                self._first_pending = time.monotonic() if self._q else None
+                self._cv.notify_all()           # wake producers blocked on a full queue
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        t0 = time.perf_counter()
+        try:
+            for kind, t, a, b in batch:
+                if kind == "sample":
+                    self.logger.add_sample(a, t=t)
+                else:
+                    self.logger.add_event(a, b, t=t, flush=False)
+            self.logger.flush()
+        except Exception as e:
+            self.errors += 1
+            print(f"[log-writer] write failed: {e}")
+        ms = (time.perf_counter() - t0) * 1e3
+        self.written += len(batch)
+        self.batches += 1
+        self.last_write_ms = ms
+        self.max_write_ms = max(self.max_write_ms, ms)
+        self._write_ms_total += ms
@@ -0,0 +1,79 @@
+# profiler.py
+# On-demand sampling profiler for the running dashboard.
+# While on, a helper thread snapshots the stacks of chosen threads (Tk, sensor, log writer)
+# every few ms via sys._current_frames() and counts them; when done it writes collapsed
+# stacks ("thread;file:func;file:func count"), which flamegraph.pl and speedscope read.
+# Nothing runs while it is off.
+
+import os, sys, time, datetime, threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    def __init__(self, out_dir, prefix="profile", interval_s=0.005, on_done=None):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.interval_s = float(interval_s)
+        self.on_done = on_done          # on_done(path, samples) on the sampler thread
+        self._th = None
+        self._stop = threading.Event()
+        self._labels = {}
+
+    @property
+    def running(self):
+        return self._th is not None and self._th.is_alive()
+
+    def start(self, threads: dict, duration_s=10.0) -> bool:
+        """threads: label -> threading.Thread (None entries are ignored)."""
+        if self.running:
+            return False
+        self._labels = {t.ident: name for name, t in threads.items() if t is not None and t.ident}
+        self._stop.clear()
+        self._th = threading.Thread(target=self._run, args=(float(duration_s),), daemon=True, name="profiler")
+        self._th.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def toggle(self, threads, duration_s=10.0):
+        if self.running:
+            self.stop(); return False
+        return self.start(threads, duration_s)
+
+    # --- sampler thread ---
+    def _run(self, duration_s):
+        counts, names = Counter(), {}
+        end = time.monotonic() + duration_s
+        n = 0
+        while not self._stop.is_set() and time.monotonic() < end:
+            frames = sys._current_frames()
+            for ident, label in self._labels.items():
+                f = frames.get(ident)
+                if f is None:
+                    continue
+                stack = []
+                while f is not None:
+                    code = f.f_code
+                    key = names.get(code)
+                    if key is None:
+                        key = names[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                    stack.append(key)
+                    f = f.f_back
+                stack.append(label)
+                counts[";".join(reversed(stack))] += 1
+            n += 1
+            del frames
+            time.sleep(self.interval_s)
+        path = self._write(counts)
+        if self.on_done:
+            try: self.on_done(path, n)
+            except Exception: pass
+
+    def _write(self, counts):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"{self.prefix}_{datetime.datetime.now():%Y%m%d-%H%M%S}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, c in counts.most_common():
+                f.write(f"{stack} {c}\n")
+        return path
@@ -0,0 +1,172 @@
+# replay.py
+# Plays a recorded session back through FSAE_Dashboard.
+# Reads XMLLogger sessions (all segments), CSVs exported from them, and dataLogger CSVs
+# (no clock in those: a fixed period is assumed). ReplaySource stands in for SensorReader.
+# A time window (span) of an XML session is read through its index (session_index.py) when
+# there is one, so only the chunks in the window are parsed.
+
+import csv, time, datetime
+
+from xml_logger import iter_session_roots
+
+ROLL_PITCH_YAW = ("roll", "pitch", "yaw")
+
+
+def _f(text, default=0.0):
+    try: return float(text)
+    except (TypeError, ValueError): return default
+
+def _secs(stamps):
+    t0 = None
+    for s in stamps:
+        try: t = datetime.datetime.fromisoformat(s)
+        except (TypeError, ValueError): t = None
+        if t is None:
+            yield None; continue
+        t0 = t0 or t
+        yield (t - t0).total_seconds()
+
+
+# ----- loaders: -> list of (t_s, force_lbs, angle_deg, [tof...], {roll,pitch,yaw}) -----
+def load_xml(path, span=None):
+    samples = None
+    if span:
+        try:
+            from session_index import SessionIndex
+            samples = list(SessionIndex(path).sample_elements(*span))
+            span = None                             # already cut to the window
+        except (OSError, ValueError):
+            pass
+    if samples is None:
+        samples = [s for root in iter_session_roots(path) for s in root.iter("Sample")]
+    frames = []
+    for s, t in zip(samples, _secs(s.get("t") for s in samples)):
+        tof = sorted(((e.tag, _f(e.text)) for e in s.findall("Angles/ToF_deg/*")),
+                     key=lambda kv: int(kv[0][1:]) if kv[0][1:].isdigit() else 0)
+        bno = {k: _f(s.findtext(f"Angles/BNO055/{k}_deg")) for k in ROLL_PITCH_YAW}
+        frames.append((t, _f(s.findtext("Raw/Force_lbs")), _f(s.findtext("Raw/Angle_deg_selected")),
+                       [v for _, v in tof], bno))
+    return _window(frames, span)
+
+def _window(frames, span):
+    if not span:
+        return frames
+    t0, t1 = span
+    return [f for f in frames if f[0] is not None and (t0 is None or f[0] >= t0) and (t1 is None or f[0] <= t1)]
+
+def load_csv(path, period_s=0.2, span=None):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return []
+    cols = list(rows[0])
+    frames = []
+    if "Raw.Force_lbs" in cols:                     # export_xml_to_csv layout
+        tof_cols = sorted((c for c in cols if c.startswith("Angles.ToF_deg.S")), key=lambda c: int(c.rsplit("S", 1)[1]))
+        for r, t in zip(rows, _secs(r.get("timestamp") for r in rows)):
+            bno = {k: _f(r.get(f"Angles.BNO055.{k}_deg")) for k in ROLL_PITCH_YAW}
+            frames.append((t, _f(r.get("Raw.Force_lbs")), _f(r.get("Raw.Angle_deg_selected")),
+                           [_f(r[c]) for c in tof_cols], bno))
+    else:                                           # dataLogger layout: Force_lb, ToF#_deg..., Gyro_Pitch_deg
+        tof_cols = [c for c in cols if c.startswith("ToF")]
+        for k, r in enumerate(rows):
+            pitch = _f(r.get("Gyro_Pitch_deg"))
+            frames.append((k * period_s, _f(r.get("Force_lb")), pitch, [_f(r[c]) for c in tof_cols],
+                           {"roll": 0.0, "pitch": pitch, "yaw": 0.0}))
+    return _window(frames, span)
+
+def load_session(path, period_s=0.2, span=None):
+    """span: (t0, t1) seconds from session start, either end None; frame times restart at 0."""
+    frames = load_csv(path, period_s, span) if path.lower().endswith(".csv") else load_xml(path, span)
+    if frames and frames[0][0]:
+        first = frames[0][0]
+        frames = [(t - first if t is not None else None, *rest) for t, *rest in frames]
+    # samples without a usable timestamp are spaced at the nominal period
+    out, last = [], -period_s
+    for t, *rest in frames:
+        t = last + period_s if t is None else t
+        out.append((t, *rest)); last = t
+    return out
+
+
+# ----- SensorReader stand-in -----
+class ReplaySource:
+    """Exposes the SensorReader attributes tick() reads; step() loads the next frame."""
+
+    def __init__(self, path, speed=1.0, period_s=0.2, span=None):
+        self.path = path
+        self.frames = load_session(path, period_s, span)
+        if not self.frames:
+            raise ValueError(f"no samples in {path}")
+        self.speed = speed                      # None = as fast as possible
+        n = max(len(f[3]) for f in self.frames)
+        self.force_lbs = 0.0
+        self.force_raw = 0
+        self.angle_deg = 0.0
+        self.angles_tof_deg = [0.0] * n
+        self.tof_active = [True] * n
+        self.bno_euler_deg = {k: 0.0 for k in ROLL_PITCH_YAW}
+        self.pos = 0
+        self.rendered = 0
+        self._wall0 = None
+        self._anchor = None                     # (wall time, session time) playback is pinned to
+
+    @property
+    def t(self):
+        return self.frames[min(self.pos, len(self.frames) - 1)][0]
+
+    @property
+    def duration(self):
+        return self.frames[-1][0]
+
+    def done(self):
+        return self.pos >= len(self.frames)
+
+    def step(self) -> bool:
+        if self.done():
+            return False
+        t, f, a, tof, bno = self.frames[self.pos]
+        if self._anchor is None:
+            self._anchor = (time.perf_counter(), t)
+        self.force_lbs, self.angle_deg = f, a
+        self.angles_tof_deg[:len(tof)] = tof
+        self.bno_euler_deg.update(bno)
+        self.pos += 1
+        self.rendered += 1
+        if self._wall0 is None:
+            self._wall0 = time.perf_counter()
+        return True
+
+    def delay_ms(self) -> int:
+        """Wait before the next frame so session time runs at `speed` (render time included)."""
+        if self.speed is None or self.done() or self._anchor is None:
+            return 1
+        w0, t0 = self._anchor
+        due = w0 + (self.frames[self.pos][0] - t0) / self.speed
+        return max(1, int(1000.0 * (due - time.perf_counter())))
+
+    def resync(self):
+        """Call after a pause so playback does not try to catch up."""
+        self._anchor = None
+
+    def seek(self, t_s):
+        t_s = min(max(0.0, t_s), self.duration)
+        lo, hi = 0, len(self.frames)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.frames[mid][0] < t_s: lo = mid + 1
+            else: hi = mid
+        self.pos = lo
+        self.resync()
+        self.reset_fps()
+
+    def reset_fps(self):
+        self.rendered, self._wall0 = 0, None
+
+    def fps(self):
+        if not self._wall0 or self.rendered < 2:
+            return 0.0
+        return (self.rendered - 1) / max(1e-9, time.perf_counter() - self._wall0)
+
+    def stop(self):
+        pass
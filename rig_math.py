@@ -0,0 +1,32 @@
+# rig_math.py
+# Small shared numerics: torque arm, unit conversion and the running least-squares fit used for
+# stiffness (session_catalog, cycles). No dependencies, safe to import anywhere.
+
+ARM_LENGTH_M = 0.25
+LBF_TO_N = 4.448
+
+
+def torque_nm(force_lbs, arm_length_m):
+    return float(force_lbs) * LBF_TO_N * float(arm_length_m)
+
+
+class LineFit:
+    """Running least-squares slope of y on x."""
+    def __init__(self):
+        self.n = 0; self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def add(self, x, y):
+        self.n += 1; self.sx += x; self.sy += y; self.sxx += x * x; self.sxy += x * y
+
+    def slope(self):
+        den = self.n * self.sxx - self.sx * self.sx
+        if self.n < 3 or abs(den) < 1e-12:
+            return None
+        return (self.n * self.sxy - self.sx * self.sy) / den
+
+    def x_at(self, y):
+        """x where the fitted line reaches y (None without a slope)."""
+        k = self.slope()
+        if not k:
+            return None
+        return (y - (self.sy - k * self.sx) / self.n) / k
@@ -0,0 +1,119 @@
+# sensor_health.py
+# Per-channel health for the acquisition loop: ok / degraded / dead.
+# Dead channels are skipped and re-probed with exponential backoff; errors are counted
+# per channel and exception type and printed as a rate-limited summary instead of per read.
+
+import time, threading
+from collections import deque, Counter
+
+OK, DEGRADED, DEAD = "ok", "degraded", "dead"
+
+
+class ChannelHealth:
+    def __init__(self, name, dead_after=5, degraded_rate=0.2, recovered_rate=0.05,
+                 backoff_s=1.0, backoff_max_s=60.0, alpha=0.05):
+        self.name = name
+        self.state = OK
+        self.ok_count = 0
+        self.err_count = 0
+        self.consec_err = 0
+        self.err_rate = 0.0             # EW fraction of failed reads
+        self.last_error = ""
+        self.errors = Counter()         # exception type -> count (since last report)
+        self._errors_lock = threading.Lock()    # ToF stations report from bus worker threads
+        self.next_probe = 0.0
+        self.dead_after, self.degraded_rate, self.recovered_rate = dead_after, degraded_rate, recovered_rate
+        self.backoff0, self.backoff_max, self.alpha = backoff_s, backoff_max_s, alpha
+        self.backoff = backoff_s
+        self._events = None             # set by HealthMonitor
+
+    def should_read(self, now) -> bool:
+        return self.state != DEAD or now >= self.next_probe
+
+    def ok(self, now):
+        self.ok_count += 1
+        self.consec_err = 0
+        self.err_rate -= self.alpha * self.err_rate
+        if self.state == DEAD:
+            self.backoff = self.backoff0
+            self._set(DEGRADED, now)
+        elif self.state == DEGRADED and self.err_rate < self.recovered_rate:
+            self._set(OK, now)
+
+    def error(self, now, exc):
+        self.err_count += 1
+        self.consec_err += 1
+        self.err_rate += self.alpha * (1.0 - self.err_rate)
+        self.last_error = f"{type(exc).__name__}: {exc}" if isinstance(exc, BaseException) else str(exc)
+        with self._errors_lock:
+            self.errors[type(exc).__name__ if isinstance(exc, BaseException) else str(exc)] += 1
+        if self.state == DEAD:
+            # failed re-probe: wait twice as long next time
+            self.backoff = min(self.backoff * 2.0, self.backoff_max)
+            self.next_probe = now + self.backoff
+        elif self.consec_err >= self.dead_after:
+            self.mark_dead(now)
+        elif self.state == OK and self.err_rate > self.degraded_rate:
+            self._set(DEGRADED, now)
+
+    def mark_dead(self, now, exc=None):
+        if exc is not None:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+        self.next_probe = now + self.backoff
+        self._set(DEAD, now)
+
+    def _set(self, state, now):
+        if state == self.state:
+            return
+        prev, self.state = self.state, state
+        if self._events is not None:
+            self._events.append({"channel": self.name, "from": prev, "to": state,
+                                 "error_rate": round(self.err_rate, 3), "errors": self.err_count,
+                                 "last_error": self.last_error,
+                                 "next_probe_s": round(self.next_probe - now, 1) if state == DEAD else 0.0})
+
+
+class HealthMonitor:
+    def __init__(self, names, report_s=10.0, **kw):
+        self._events = deque()
+        self.channels = {}
+        for n in names:
+            h = ChannelHealth(n, **kw)
+            h._events = self._events
+            self.channels[n] = h
+        self.report_s = float(report_s)
+        self._next_report = 0.0
+
+    def __getitem__(self, name) -> ChannelHealth:
+        return self.channels[name]
+
+    def counts(self, names=None) -> dict:
+        c = Counter(h.state for n, h in self.channels.items() if names is None or n in names)
+        return {OK: c[OK], DEGRADED: c[DEGRADED], DEAD: c[DEAD]}
+
+    def states(self) -> dict:
+        return {n: h.state for n, h in self.channels.items()}
+
+    def pop_events(self):
+        out = []
+        while self._events:
+            out.append(self._events.popleft())
+        return out
+
+    def maybe_report(self, now=None):
+        """At most one console line per report_s, and only if something failed since the last one."""
+        now = time.monotonic() if now is None else now
+        if now < self._next_report:
+            return None
+        parts = []
+        for n, h in self.channels.items():
+            with h._errors_lock:
+                errs, h.errors = h.errors, Counter()
+            if errs:
+                parts.append(f"{n} {h.state} (" + ", ".join(f"{k} x{v}" for k, v in errs.items()) + ")")
+        if not parts:
+            return None
+        self._next_report = now + self.report_s
+        line = "[health] " + "; ".join(parts)
+        print(line)
+        return line
@@ -4,11 +4,29 @@
 
 import math, time, threading, os
 os.environ["BLINKA_I2C"] = "13"
-import board, busio, digitalio, serial
-from adafruit_tca9548a import TCA9548A
-import numpy as np
+
+from tof_scheduler import ToFScheduler
+from topology import load_topology, open_channels
+from sensor_health import HealthMonitor, DEAD
+from deadline import DeadlineScheduler
+from rig_math import ARM_LENGTH_M    # torque arm, shared with session_catalog; kept importable from here
+
+# Blinka + HX711 (Pi). Guarded so the reader can be driven by other drivers off the Pi.
+try:
+    import board, digitalio
+    from adafruit_hx711.hx711 import HX711
+    from adafruit_hx711.analog_in import AnalogIn
+    HAVE_BLINKA = True
+except Exception:
+    HAVE_BLINKA = False
 
 # Optional drivers (load if installed)
+try:
+    import serial                       # pyserial, for the BNO055 UART
+    HAVE_SERIAL = True
+except Exception:
+    HAVE_SERIAL = False
+
 try:
     from adafruit_vl53l1x import VL53L1X
     HAVE_VL53 = True
@@ -21,20 +39,13 @@ try:
 except Exception:
     HAVE_BNO = False
 
-# Adafruit CircuitPython HX711
-from adafruit_hx711.hx711 import HX711
-from adafruit_hx711.analog_in import AnalogIn
-
 # -------- Rig constants --------
 L_BASELINE_MM = 100.0
-ARM_LENGTH_M  = 0.25
-TCA_CHANNELS  =  8 #[0,1,2,3,4,5,6,7]
+TCA_CHANNELS  =  8 #[0,1,2,3,4,5,6,7]   single-mux default; see topology.py for more
 
-# HX711 pins: D6 = DOUT (input), D11 = SCK (output)
-HX_DATA_PIN = digitalio.DigitalInOut(board.D6)   # BCM6, phys 31
-HX_CLK_PIN  = digitalio.DigitalInOut(board.D11)  # BCM11, phys 23
-HX_DATA_PIN.direction = digitalio.Direction.INPUT
-HX_CLK_PIN.direction  = digitalio.Direction.OUTPUT
+# HX711 pins: D6 = DOUT (input), D11 = SCK (output) -- BCM6/phys 31, BCM11/phys 23
+HX_DATA_PIN_NAME = "D6"
+HX_CLK_PIN_NAME  = "D11"
 
 # Calibration: set after two-point calibration
 HX_COUNTS_PER_LB = 10000.0      # <-- placeholder: adjust after you see raw moving
@@ -44,55 +55,88 @@ HX_SMOOTH_N = 5                 # moving average window for force
 USE_BNO_FOR_ANGLE = True
 BNO_AXIS = "pitch"
 TARGET_HZ = 20.0
+RATE_POLICY = "skip"            # overrun: skip missed deadlines | catch_up (see deadline.py)
+UPDATE_MS = 200                 # dashboard tick (UI refresh and logged sample period)
+TOF_STALE_S = 1.0               # no fresh ToF reading for this long counts as an error
 # --------------------------------
 
 
 class SensorReader:
-    def __init__(self, target_hz: float = TARGET_HZ):
+    def __init__(self, target_hz: float = TARGET_HZ, clock=time.monotonic, start: bool = True, topology=None,
+                 policy: str = RATE_POLICY):
+        self.topology = topology or load_topology()
+        n = len(self.topology)
+
         # outputs the dashboard reads
         self.force_lbs = 0.0
         self.force_raw = 0            # <- raw counts exposed for debugging
-        self.angles_tof_deg = [0.0] * TCA_CHANNELS
-        self.tof_active = [False] * TCA_CHANNELS
+        self.angles_tof_deg = [0.0] * n
+        self.tof_active = [False] * n
         self.bno_euler_deg = {"roll": 0.0, "pitch": 0.0, "yaw": 0.0}
         self.angle_deg = 0.0
 
+        self.tof_last_ok = [0.0] * n   # monotonic time of last good read
+        self._tof_opened = [0.0] * n   # ...and of the last (re)initialisation
+        self.force_last_ok = 0.0
+        self.t_step = (0.0, 0.0)       # (deadline, actual start) of the last acquisition; one
+                                       # tuple so readers on other threads never mix two steps
+
+        self._clock = clock
         self._dt = 1.0 / float(target_hz)
+        self.rate = DeadlineScheduler(target_hz, policy, clock)     # main acquisition loop
+        self._bus_rates = {}                 # bus -> DeadlineScheduler of its ToF worker
         self._stop = threading.Event()
+        self._listeners = []                 # called with every sample at acquisition rate
+        self._th = None
+        self._bus_threads = []               # one ToF worker per I2C bus
+
+        self._tof = [None] * n
+        self._tof_ch = [None] * n            # I2C channel per station, kept for re-probing
+        self.tof_sched = ToFScheduler(n, target_hz)
+        self.health = HealthMonitor(self.topology.names() + ["HX711", "BNO055"])
+        self._bno = None
+        self._init_hardware()
+        self._tare()
 
-        # I2C + TCA
-        self._i2c = busio.I2C(board.SCL, board.SDA)
-        self._tca = TCA9548A(self._i2c)
+        self._tof_health = [self.health[name] for name in self.topology.names()]
+        self._hx_health = self.health["HX711"]
+        self._bno_health = self.health["BNO055"]
 
-        # VL53L1X per channel (only init if present)
-        self._tof = [None] * TCA_CHANNELS
+        self._force_buf = []
+
+        # short boot-time debug: show raw every 0.5s for 5 seconds
+        self._dbg_until = self._clock() + 5.0
+        self._dbg_next  = 0.0
+
+        # start background read loops (start=False: caller drives _step() or calls start() later)
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the per-bus ToF workers and the acquisition loop."""
+        if self._th is not None:
+            return
+        for bus in self.topology.buses:
+            idx = [st.index for st in self.topology.stations_on(bus)]
+            if idx:
+                self._bus_rates[bus] = DeadlineScheduler(1.0 / self._dt, self.rate.policy, self._clock)
+                th = threading.Thread(target=self._bus_loop, args=(idx, self._bus_rates[bus]),
+                                      daemon=True, name=f"tof-bus-{bus}")
+                th.start()
+                self._bus_threads.append(th)
+        self._th = threading.Thread(target=self._loop, daemon=True)
+        self._th.start()
+
+    def _init_hardware(self):
+        # I2C buses + TCA muxes -> VL53L1X per station (only init if present)
         if HAVE_VL53:
-            # if 0x29 in self._tca[i].scan():
-            for i in range(TCA_CHANNELS):
-                try:
-                    self._tof[i] = VL53L1X(self._tca[i])
-                    self._tof[i].start_ranging()
-                    self._tof[i].timing_budget = 500
-                    self.tof_active[i] = True
-                    print(self._tof[i], "At position", i)
-                except:
-                    pass
-        #     for i, ch in enumerate(TCA_CHANNELS):
-        #         try:
-        #             ch_i2c = self._tca[ch]
-        #             if 0x29 in ch_i2c.scan():
-        #                 s = VL53L1X(ch_i2c)
-        #                 s.distance_mode = 1    # short
-        #                 # s.timing_budget = 50   # ms
-        #                 s.start_ranging()
-        #                 self._tof[i] = s
-        #                 self.tof_active[i] = True
-        #         except Exception:
-        #             pass
+            self._tof_ch = open_channels(self.topology)
+        for st in self.topology.stations:
+            if self._try_open_tof(st.index):
+                print(self._tof[st.index], "At", st)
 
         # BNO055 (UART preferred)
-        self._bno = None
-        if HAVE_BNO:
+        if HAVE_BNO and HAVE_SERIAL:
             try:
                 ser = serial.Serial('/dev/ttyAMA0', baudrate=115200, timeout=1)
                 self._bno = adafruit_bno055.BNO055_UART(ser)
@@ -100,9 +144,37 @@ class SensorReader:
                 self._bno = None
 
         # HX711: bring up quickly
-        self._hx = HX711(HX_DATA_PIN, HX_CLK_PIN)
+        if not HAVE_BLINKA:
+            raise RuntimeError("HX711 needs Blinka (board, digitalio) and adafruit_hx711; "
+                               "install them on the Pi, or drive SensorReader with other drivers (see soak.py)")
+        data = digitalio.DigitalInOut(getattr(board, HX_DATA_PIN_NAME))
+        clk  = digitalio.DigitalInOut(getattr(board, HX_CLK_PIN_NAME))
+        data.direction = digitalio.Direction.INPUT
+        clk.direction  = digitalio.Direction.OUTPUT
+        self._hx = HX711(data, clk)
         self._hx_chan = AnalogIn(self._hx, HX711.CHAN_A_GAIN_128)
 
+    def _open_tof(self, i):
+        if not HAVE_VL53 or self._tof_ch[i] is None:
+            raise OSError("no VL53L1X driver or I2C channel")
+        return VL53L1X(self._tof_ch[i])
+
+    def _try_open_tof(self, i) -> bool:
+        """(Re)initialise station i; on failure it is marked dead and re-probed with backoff."""
+        h = self.health[self.topology.stations[i].name]
+        try:
+            s = self._open_tof(i)
+            self.tof_sched.apply(i, s)
+        except Exception as e:
+            self._tof[i], self.tof_active[i] = None, False
+            if h.state == DEAD: h.error(self._clock(), e)
+            else: h.mark_dead(self._clock(), e)
+            return False
+        self._tof[i], self.tof_active[i] = s, True
+        self._tof_opened[i] = self._clock()
+        return True
+
+    def _tare(self):
         # Startup tare (average zero)
         t_end = time.monotonic() + HX_STARTUP_TARE_S
         zeros = []
@@ -115,80 +187,138 @@ class SensorReader:
             time.sleep(0.01)
         self._hx_zero = int(sum(zeros) / max(1, len(zeros)))
 
-        self._force_buf = []
+    def add_listener(self, fn):
+        """fn(sample: dict) runs on the acquisition thread after every read; keep it short."""
+        self._listeners.append(fn)
 
-        # short boot-time debug: show raw every 0.5s for 5 seconds
-        self._dbg_until = time.monotonic() + 5.0
-        self._dbg_next  = 0.0
-
-        # start background read loop
-        self._th = threading.Thread(target=self._loop, daemon=True)
-        self._th.start()
+    def remove_listener(self, fn):
+        try: self._listeners.remove(fn)
+        except ValueError: pass
 
     def _loop(self):
-        while not self._stop.is_set():
-            # -------- HX711: raw -> lbs --------
+        while True:
+            t_sched = self.rate.wait(self._stop)
+            if t_sched is None:
+                return
+            self._step(t_sched)
+
+    def _bus_loop(self, idx, rate):
+        # each bus is its own transaction queue, so buses are read in parallel
+        while rate.wait(self._stop) is not None:
+            self._read_tof(idx)
+
+    def timing(self) -> dict:
+        """Deadline stats of the acquisition loop and each ToF bus worker."""
+        out = {"acq": self.rate.stats()}
+        for bus, r in self._bus_rates.items():
+            out[f"tof_bus_{'default' if bus is None else bus}"] = r.stats()
+        return out
+
+    def _step(self, t_sched=None):
+        t_acq = self._clock()
+        self.t_step = (t_acq if t_sched is None else t_sched, t_acq)
+        # -------- HX711: raw -> lbs --------
+        try:
+            raw = int(self._hx_chan.value)
+            self.force_raw = raw
+            lbs = (raw - self._hx_zero) / float(HX_COUNTS_PER_LB)
+
+            self._force_buf.append(lbs)
+            if len(self._force_buf) > HX_SMOOTH_N:
+                self._force_buf.pop(0)
+            self.force_lbs = sum(self._force_buf) / len(self._force_buf)
+            self.force_last_ok = self._clock()
+
+            # boot-time console debug
+            now = self._clock()
+            if now < self._dbg_until and now >= self._dbg_next:
+                self._dbg_next = now + 0.5
+                print(f"[HX711] raw={raw} zero={self._hx_zero} lbs≈{self.force_lbs:.2f}")
+            self._hx_health.ok(now)
+        except Exception as e:
+            # keep last values on transient error
+            self._hx_health.error(self._clock(), e)
+
+        # -------- VL53L1X angles (bus workers do this when running threaded) --------
+        if not self._bus_threads:
+            self._read_tof(range(len(self._tof)))
+
+        # -------- BNO055 Euler (if present) --------
+        now = self._clock()
+        if self._bno and self._bno_health.should_read(now):
             try:
-                raw = int(self._hx_chan.value)
-                self.force_raw = raw
-                lbs = (raw - self._hx_zero) / float(HX_COUNTS_PER_LB)
-
-                self._force_buf.append(lbs)
-                if len(self._force_buf) > HX_SMOOTH_N:
-                    self._force_buf.pop(0)
-                self.force_lbs = sum(self._force_buf) / len(self._force_buf)
-
-                # boot-time console debug
-                now = time.monotonic()
-                if now < self._dbg_until and now >= self._dbg_next:
-                    self._dbg_next = now + 0.5
-                    print(f"[HX711] raw={raw} zero={self._hx_zero} lbs≈{self.force_lbs:.2f}")
-            except Exception:
-                # keep last values on transient error
-                pass
+                e = self._bno.euler
+                if e and all(v is not None for v in e):
+                    self.bno_euler_deg["roll"]  = float(e[0])
+                    self.bno_euler_deg["pitch"] = float(e[1])
+                    self.bno_euler_deg["yaw"]   = float(e[2])
+                    self._bno_health.ok(now)
+                else:
+                    self._bno_health.error(now, "incomplete euler")
+            except Exception as ex:
+                self._bno_health.error(now, ex)
+
+        # -------- Selected angle for UI --------
+        self.angle_deg = self._select_angle()
+        self.health.maybe_report(now)
+
+        if self._listeners:
+            sample = self.snapshot()
+            for fn in list(self._listeners):
+                try: fn(sample)
+                except Exception: pass
+
+    def _read_tof(self, idx):
+        for i in idx:
+            h = self._tof_health[i]
+            now = self._clock()
+            if not h.should_read(now):
+                continue                         # dead: wait for the next probe
+            if self._tof[i] is None:
+                if not self._try_open_tof(i):
+                    continue
+            try:
+                if not self._tof[i].data_ready:
+                    # budget not elapsed yet; keep last angle unless it has gone stale
+                    # (a re-opened sensor gets one stale period to produce its first reading)
+                    if now - max(self.tof_last_ok[i], self._tof_opened[i]) > TOF_STALE_S and self.tof_last_ok[i] > 0:
+                        h.error(now, "stale")
+                        if h.state == DEAD:
+                            self._tof[i], self.tof_active[i] = None, False
+                    continue
+                d_cm = self._tof[i].distance
+                self._tof[i].clear_interrupt()
+                if self.tof_sched.update(i, d_cm, now):
+                    self.tof_sched.apply(i, self._tof[i])
+                d_mm = d_cm * 10.0  # cm -> mm
+                self.angles_tof_deg[i] = math.degrees(
+                    math.acos(min(1.0, L_BASELINE_MM / max(1e-6, d_mm)))
+                )
+                self.tof_last_ok[i] = now
+                if not self.tof_active[i]:
+                    self.tof_active[i] = True
+                h.ok(now)
+            except Exception as e:
+                h.error(now, e)
+                if h.state == DEAD:
+                    # drop the driver so the next probe re-initialises it
+                    self._tof[i], self.tof_active[i] = None, False
 
-            # -------- VL53L1X angles (if present) --------
-            for i in range(TCA_CHANNELS):
-                try:
-                    d_mm = self._tof[i].distance * 10.0  # cm -> mm
-                    self._tof[i].clear_interrupt()
-                    self.angles_tof_deg[i] = math.degrees(
-                        math.acos(max(1e-6, d_mm), L_BASELINE_MM)
-                    )
-                    print(self.angles_tof_deg[i])
-                except:
-                    print("Problem with ToF sensor", i+1)
-                    pass
-            # for i, s in enumerate(self._tof):
-            #     if not s:
-            #         continue
-            #     try:
-            #         if s.data_ready:
-            #             d_mm = float(s.distance) * 10.0  # cm -> mm
-            #             s.clear_interrupt()
-            #             self.angles_tof_deg[i] = math.degrees(
-            #                 math.atan2(max(1e-6, d_mm), L_BASELINE_MM)
-            #             )
-            #             print(self.angles_tof_deg[i])
-            #     except Exception:
-            #         pass
-            #         print("Problem with ToF sensor", s, i)
-
-            # -------- BNO055 Euler (if present) --------
-            if self._bno:
-                try:
-                    e = self._bno.euler
-                    if e and all(v is not None for v in e):
-                        self.bno_euler_deg["roll"]  = float(e[0])
-                        self.bno_euler_deg["pitch"] = float(e[1])
-                        self.bno_euler_deg["yaw"]   = float(e[2])
-                except Exception:
-                    pass
-
-            # -------- Selected angle for UI --------
-            self.angle_deg = self._select_angle()
-
-            time.sleep(self._dt)
+    def snapshot(self) -> dict:
+        t_sched, t_acq = self.t_step
+        return {
+            "t": t_acq,
+            "t_sched": t_sched,
+            "force_lbs": self.force_lbs,
+            "force_raw": self.force_raw,
+            "angle_deg": self.angle_deg,
+            "tof_deg": list(self.angles_tof_deg),
+            "tof_active": list(self.tof_active),
+            "tof_last_ok": list(self.tof_last_ok),
+            "force_last_ok": self.force_last_ok,
+            "bno": dict(self.bno_euler_deg),
+            "health": self.health.states(),
+        }
 
     def _select_angle(self) -> float:
         if USE_BNO_FOR_ANGLE and self._bno:
@@ -198,7 +328,9 @@ class SensorReader:
 
     def stop(self):
         self._stop.set()
-        self._th.join(timeout=1.0)
+        for th in [self._th] + self._bus_threads:
+            if th:
+                th.join(timeout=1.0)
 
 
 
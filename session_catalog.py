@@ -0,0 +1,217 @@
+# session_catalog.py
+# SQLite catalog of logged sessions (./Data/*.csv from dataLogger, "xml files/" from XMLLogger).
+# Sessions are indexed once and re-read only when their files change.
+#   python session_catalog.py scan
+#   python session_catalog.py query --min-force 1500 --since 2026-09-01
+
+import os, re, csv, json, sqlite3, argparse, datetime
+
+from xml_logger import manifest_path_for, session_segments, iter_session_roots
+from rig_math import ARM_LENGTH_M, LineFit, torque_nm
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "sessions.sqlite")
+XML_DIR = os.path.join(BASE_DIR, "xml files")
+CSV_DIR = os.path.join(BASE_DIR, "Data")   # dataLogger.createUniqueFilename writes ./Data
+
+_SEGMENT_RE = re.compile(r"\.\d{4}-\d\d-\d\d\.\d{3}(-\d+)?\.xml(\.gz)?$")   # rotated XMLLogger segments
+_CSV_NAME_FMT = "%m-%d-%Y_%H-%M-%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    path        TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    started     TEXT,
+    ended       TEXT,
+    duration_s  REAL,
+    samples     INTEGER,
+    max_force   REAL,
+    zero_events INTEGER,
+    stiffness   REAL,            -- Nm/deg, least-squares torque vs angle
+    meta        TEXT,            -- session_meta attributes as JSON
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_started ON sessions(started);
+CREATE INDEX IF NOT EXISTS ix_sessions_force   ON sessions(max_force);
+"""
+
+
+# ----- DB -----
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    con.executescript(SCHEMA)
+    return con
+
+def _fingerprint(paths) -> str:
+    parts = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            parts.append(f"{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            pass
+    return "|".join(parts)
+
+
+# ----- stats -----
+def _float(text):
+    try: return float(text)
+    except (TypeError, ValueError): return None
+
+def _parse_t(text):
+    try: return datetime.datetime.fromisoformat(text)
+    except (TypeError, ValueError): return None
+
+
+# ----- readers -----
+def summarize_xml(xml_path: str) -> dict:
+    meta, first, last = {}, None, None
+    samples, zeros, max_force, fit = 0, 0, None, LineFit()
+    for root in iter_session_roots(xml_path):
+        if not meta:
+            meta = {k: v for k, v in root.attrib.items() if k != "segment"}
+        zeros += sum(1 for e in root.iter("Event") if e.get("type") == "Zero")
+        for s in root.iter("Sample"):
+            samples += 1
+            t = s.get("t")
+            first = first or t; last = t or last
+            f = _float(s.findtext("Raw/Force_lbs"))
+            if f is not None:
+                max_force = f if max_force is None else max(max_force, f)
+            a, tq = _float(s.findtext("Raw/Angle_deg_selected")), _float(s.findtext("Raw/Torque_Nm"))
+            if a is not None and tq is not None:
+                fit.add(a, tq)
+    t0, t1 = _parse_t(first), _parse_t(last)
+    return {"kind": "xml", "started": first, "ended": last,
+            "duration_s": (t1 - t0).total_seconds() if t0 and t1 else None,
+            "samples": samples, "max_force": max_force, "zero_events": zeros,
+            "stiffness": fit.slope(), "meta": meta}
+
+def summarize_csv(csv_path: str) -> dict:
+    samples, max_force, fit = 0, None, LineFit()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            samples += 1
+            force = _float(row.get("Force_lb"))
+            if force is None:
+                continue
+            max_force = force if max_force is None else max(max_force, force)
+            a = _float(row.get("Gyro_Pitch_deg"))
+            if a is not None:
+                fit.add(a, torque_nm(force, ARM_LENGTH_M))
+    # the CSV carries no clock: the start is in the file name, the end is the last append
+    try: t0 = datetime.datetime.strptime(os.path.splitext(os.path.basename(csv_path))[0], _CSV_NAME_FMT)
+    except ValueError: t0 = None
+    t1 = datetime.datetime.fromtimestamp(os.path.getmtime(csv_path))
+    return {"kind": "csv", "started": t0.isoformat() if t0 else None, "ended": t1.isoformat(),
+            "duration_s": (t1 - t0).total_seconds() if t0 else None,
+            "samples": samples, "max_force": max_force, "zero_events": 0,
+            "stiffness": fit.slope(), "meta": {}}
+
+
+# ----- indexing -----
+def catalog_session(path: str, con: sqlite3.Connection | None = None, force: bool = False) -> bool:
+    """Index one session (XML live path or dataLogger CSV). Returns True if the row changed.
+    The path is the key: XMLLogger stamps each run's file name with its start time, so runs
+    of the same rig/mode get separate rows."""
+    own = con is None
+    con = con or connect()
+    try:
+        path = os.path.abspath(path)
+        is_xml = path.endswith(".xml")
+        files = session_segments(path) + [manifest_path_for(path)] if is_xml else [path]
+        fp = _fingerprint(files)
+        row = con.execute("SELECT fingerprint FROM sessions WHERE path=?", (path,)).fetchone()
+        if row and row["fingerprint"] == fp and not force:
+            return False
+        info = summarize_xml(path) if is_xml else summarize_csv(path)
+        con.execute("INSERT OR REPLACE INTO sessions VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                    (path, info["kind"], info["started"], info["ended"], info["duration_s"],
+                     info["samples"], info["max_force"], info["zero_events"], info["stiffness"],
+                     json.dumps(info["meta"]), fp))
+        con.commit()
+        return True
+    finally:
+        if own: con.close()
+
+def _session_files(dirs):
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            p = os.path.join(d, name)
+            if name.endswith(".xml") and not _SEGMENT_RE.search(name) and not name.startswith("xmltmp_"):
+                yield p
+            elif name.endswith(".csv") and os.path.abspath(d) != os.path.abspath(XML_DIR):
+                yield p       # CSVs in "xml files/" are exports of an XML session
+
+def scan(dirs=(CSV_DIR, XML_DIR), con=None, force=False):
+    """Index new/changed sessions and drop rows whose files are gone (rows outside `dirs` are kept
+    while their file exists). Returns (updated, removed)."""
+    own = con is None
+    con = con or connect()
+    try:
+        seen, updated = set(), 0
+        for p in _session_files(dirs):
+            seen.add(os.path.abspath(p))
+            try:
+                updated += catalog_session(p, con, force)
+            except Exception as e:
+                print(f"[catalog] skip {p}: {e}")
+        gone = [r["path"] for r in con.execute("SELECT path FROM sessions")
+                if r["path"] not in seen and not os.path.exists(r["path"])]
+        con.executemany("DELETE FROM sessions WHERE path=?", [(p,) for p in gone])
+        con.commit()
+        return updated, len(gone)
+    finally:
+        if own: con.close()
+
+def query(con, min_force=None, max_force=None, since=None, until=None, kind=None, meta=None, limit=None):
+    sql, args = "SELECT * FROM sessions WHERE 1=1", []
+    if min_force is not None: sql += " AND max_force >= ?"; args.append(min_force)
+    if max_force is not None: sql += " AND max_force <= ?"; args.append(max_force)
+    if since: sql += " AND started >= ?"; args.append(since)
+    if until: sql += " AND started < ?"; args.append(until)
+    if kind: sql += " AND kind = ?"; args.append(kind)
+    for k, v in (meta or {}).items():
+        sql += " AND json_extract(meta, ?) = ?"; args += [f"$.{k}", v]
+    sql += " ORDER BY started"
+    if limit: sql += " LIMIT ?"; args.append(limit)
+    return con.execute(sql, args).fetchall()
+
+
+# ----- CLI -----
+def _fmt(v, spec=""):
+    return "-" if v is None else format(v, spec)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Torsion rig session catalog")
+    ap.add_argument("--db", default=DB_PATH)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("scan", help="index new/changed sessions")
+    sp.add_argument("dirs", nargs="*", default=[CSV_DIR, XML_DIR])
+    sp.add_argument("--force", action="store_true", help="re-read every session")
+    qp = sub.add_parser("query", help="search the catalog")
+    qp.add_argument("--min-force", type=float); qp.add_argument("--max-force", type=float)
+    qp.add_argument("--since", help="ISO date/time"); qp.add_argument("--until", help="ISO date/time")
+    qp.add_argument("--kind", choices=["xml", "csv"])
+    qp.add_argument("--meta", action="append", default=[], metavar="KEY=VALUE")
+    qp.add_argument("--limit", type=int)
+    a = ap.parse_args(argv)
+
+    con = connect(a.db)
+    if a.cmd == "scan":
+        updated, removed = scan(a.dirs, con, a.force)
+        total = con.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        print(f"{updated} updated, {removed} removed, {total} sessions")
+        return
+    meta = dict(m.split("=", 1) for m in a.meta)
+    for r in query(con, a.min_force, a.max_force, a.since, a.until, a.kind, meta, a.limit):
+        print(f"{_fmt(r['started']):23}  {_fmt(r['duration_s'], '8.1f')}s  n={_fmt(r['samples']):>6}  "
+              f"max={_fmt(r['max_force'], '7.1f')} lb  zeros={r['zero_events']}  "
+              f"k={_fmt(r['stiffness'], '.3f')} Nm/deg  {r['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+# session_index.py
+# Sidecar time index for XMLLogger sessions ("<name>.index.jsonl" next to the XML).
+# Samples are grouped into chunks of CHUNK_SAMPLES; each chunk line records its segment, the byte
+# range of its <Sample> elements relative to the segment's <Samples> tag (events are written
+# before samples, so only that base moves between flushes) and min/max/mean of every numeric
+# channel. The writer appends a line per finished chunk as the logger writes; SessionIndex folds
+# the chunks into a min/max pyramid so a range query touches about as many nodes as it returns.
+#   python session_index.py build "xml files/torsion_session_20261019-143005.xml"
+#   python session_index.py query "xml files/torsion_session_20261019-143005.xml" --from 720 --to 840 --points 200 --channels Raw.Torque_Nm Angles.ToF_deg.S3
+
+import os, sys, json, bisect, argparse, datetime, xml.etree.ElementTree as ET
+
+from xml_logger import manifest_path_for, open_segment, iter_session_roots
+
+CHUNK_SAMPLES = 64
+FANOUT = 8                      # chunks per node one pyramid level up
+
+
+def index_path_for(xml_path: str) -> str:
+    base, _ = os.path.splitext(xml_path)
+    return f"{base}.index.jsonl"
+
+def _leaves(elem, prefix=""):
+    """(channel, value) for every numeric leaf, named like export_xml_to_csv columns."""
+    for c in elem:
+        tag = f"{prefix}.{c.tag}" if prefix else c.tag
+        if len(c):
+            yield from _leaves(c, tag)
+        else:
+            try: yield tag, float(c.text)
+            except (TypeError, ValueError): pass
+
+def _parse_t(text):
+    try: return datetime.datetime.fromisoformat(text)
+    except (TypeError, ValueError): return None
+
+
+# ----- writing (driven by XMLLogger on whatever thread writes the log) -----
+class SessionIndexWriter:
+    def __init__(self, xml_path, chunk=CHUNK_SAMPLES):
+        self.path = index_path_for(xml_path)
+        self.chunk = int(chunk)
+        self.channels = {}              # name -> column, in first-seen order
+        self._f = open(self.path, "w", encoding="utf-8")
+        self._t_start = None
+        self._seg, self._off = None, 0  # segment being indexed, byte offset of its next <Sample>
+        self._acc = None
+        self._pending = []              # finished lines waiting for the XML that holds them
+
+    def add(self, segment, elem):
+        if segment != self._seg:
+            self.end_segment()
+            self._seg, self._off = segment, 0
+        size = len(ET.tostring(elem, encoding="unicode").encode("utf-8"))
+        t = _parse_t(elem.get("t"))
+        if self._t_start is None and t is not None:
+            self._t_start = t
+            self._pending.append({"start": elem.get("t"), "chunk": self.chunk, "fanout": FANOUT})
+        s = (t - self._t_start).total_seconds() if t is not None else None
+        a = self._acc
+        if a is None:
+            a = self._acc = {"seg": segment, "off": self._off, "n": 0, "s0": s, "s1": s, "min": {}, "max": {}, "sum": {}}
+        self._off += size
+        a["n"] += 1
+        if s is not None:
+            a["s0"] = s if a["s0"] is None else a["s0"]
+            a["s1"] = s
+        mn, mx, sm = a["min"], a["max"], a["sum"]
+        for name, v in _leaves(elem):
+            if name in sm:
+                if v < mn[name]: mn[name] = v
+                if v > mx[name]: mx[name] = v
+                sm[name] += v
+            else:
+                mn[name] = mx[name] = sm[name] = v
+        if a["n"] >= self.chunk:
+            self._finish()
+
+    def end_segment(self):
+        """A chunk never spans two segments."""
+        if self._acc is not None:
+            self._finish()
+
+    def commit(self):
+        """Call once the XML is on disk: the lines written now point at bytes that exist."""
+        if self._pending:
+            self._f.write("".join(json.dumps(d, separators=(",", ":")) + "\n" for d in self._pending))
+            self._f.flush()
+            self._pending = []
+
+    def close(self):
+        self.end_segment()
+        self.commit()
+        self._f.close()
+
+    def _finish(self):
+        a, self._acc = self._acc, None
+        if a["s0"] is None:
+            return
+        new = [k for k in a["sum"] if k not in self.channels]
+        if new:
+            for k in new:
+                self.channels[k] = len(self.channels)
+            self._pending.append({"channels": list(self.channels)})
+        cols = [None] * len(self.channels)
+        mn, mx, mean = list(cols), list(cols), list(cols)
+        for k, col in self.channels.items():
+            if k in a["sum"]:
+                mn[col], mx[col] = a["min"][k], a["max"][k]
+                mean[col] = round(a["sum"][k] / a["n"], 4)
+        self._pending.append({"seg": a["seg"], "off": a["off"], "end": self._off, "n": a["n"],
+                              "s0": round(a["s0"], 3), "s1": round(a["s1"], 3), "min": mn, "max": mx, "mean": mean})
+
+
+def build_index(xml_path: str, chunk=CHUNK_SAMPLES) -> str:
+    """Index a session after the fact (written before indexing existed, or index lost)."""
+    w = SessionIndexWriter(xml_path, chunk)
+    for root in iter_session_roots(xml_path):
+        seg = int(root.get("segment", 0))
+        for s in root.iter("Sample"):
+            w.add(seg, s)
+        w.end_segment()
+    w.close()
+    return w.path
+
+
+# ----- reading -----
+class _Level:
+    def __init__(self, nodes):
+        self.nodes = nodes              # (s0, s1, n, mins, maxs, sums)
+        self.s1 = [nd[1] for nd in nodes]
+        self.span = (nodes[-1][1] - nodes[0][0]) / len(nodes) if nodes else 0.0
+
+
+def _merge(nodes, ncol):
+    mn, mx, sm = [None] * ncol, [None] * ncol, [0.0] * ncol
+    n = 0
+    for _, _, k, a, b, c in nodes:
+        n += k
+        for j in range(len(a)):
+            if a[j] is None:
+                continue
+            mn[j] = a[j] if mn[j] is None or a[j] < mn[j] else mn[j]
+            mx[j] = b[j] if mx[j] is None or b[j] > mx[j] else mx[j]
+            sm[j] += c[j]
+    return nodes[0][0], nodes[-1][1], n, mn, mx, sm
+
+
+class SessionIndex:
+    def __init__(self, xml_path):
+        self.xml_path = xml_path
+        self.path = index_path_for(xml_path)
+        self.channels, self.start, self.chunks = [], None, []
+        fanout = FANOUT
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try: d = json.loads(line)
+                except ValueError: break            # torn last line of a live session
+                if "channels" in d:
+                    self.channels = d["channels"]
+                elif "start" in d:
+                    self.start, fanout = _parse_t(d["start"]), d.get("fanout", FANOUT)
+                else:
+                    self.chunks.append(d)
+        ncol = len(self.channels)
+        pad = lambda v: v + [None] * (ncol - len(v))
+        level = [(c["s0"], c["s1"], c["n"], pad(c["min"]), pad(c["max"]),
+                  [m * c["n"] if m is not None else 0.0 for m in pad(c["mean"])]) for c in self.chunks]
+        self.fanout = fanout
+        self.levels = [_Level(level)]
+        while len(level) > 1:
+            level = [_merge(level[i:i + fanout], ncol) for i in range(0, len(level), fanout)]
+            self.levels.append(_Level(level))
+        self._files = {}
+        self._bases = {}
+
+    @property
+    def duration(self):
+        return self.chunks[-1]["s1"] if self.chunks else 0.0
+
+    def query(self, t0=None, t1=None, points=500, channels=None) -> dict:
+        """Min/max/mean of `channels` in up to `points` equal buckets over [t0, t1] seconds from session start.
+        "t" is each bucket's start edge, "s0"/"s1" the first/last sample time actually in it.
+        Pyramid nodes that fit inside one bucket are used whole; a node cut by a bucket edge is split
+        into its children, down to raw samples for the chunk at the edge -- so the cost is about
+        (points + edges) * fanout * levels plus one chunk read per edge, not the range length."""
+        t0 = 0.0 if t0 is None else float(t0)
+        t1 = self.duration if t1 is None else float(t1)
+        names = channels or self.channels
+        cols = [self.channels.index(c) for c in names]
+        out = {"t": [], "s0": [], "s1": [], "n": [], "level": None, **{c: {"min": [], "max": [], "mean": []} for c in names}}
+        if t1 < t0 or not self.chunks:
+            return out
+        points = max(1, int(points))
+        width = (t1 - t0) / points
+        lvl = None
+        for k, L in enumerate(self.levels):
+            if L.span <= width:
+                lvl = k
+        out["level"] = "raw" if lvl is None else lvl
+        ncol = len(self.channels)
+        buckets = {}                    # b -> [s0, s1, n, mins, maxs, sums]
+        bucket_of = lambda t: min(int((t - t0) / width), points - 1) if width > 0 else 0
+
+        def add(b, s0, s1, n, mn, mx, sm):
+            acc = buckets.get(b)
+            if acc is None:
+                buckets[b] = [s0, s1, n, list(mn), list(mx), list(sm)]
+                return
+            acc[0], acc[1], acc[2] = min(acc[0], s0), max(acc[1], s1), acc[2] + n
+            for j in range(ncol):
+                if mn[j] is None:
+                    continue
+                acc[3][j] = mn[j] if acc[3][j] is None or mn[j] < acc[3][j] else acc[3][j]
+                acc[4][j] = mx[j] if acc[4][j] is None or mx[j] > acc[4][j] else acc[4][j]
+                acc[5][j] += sm[j]
+
+        def raw(i):
+            col = {c: j for j, c in enumerate(self.channels)}
+            for smp in self._read_chunk(self.chunks[i]):
+                t = _parse_t(smp.get("t"))
+                if t is None:
+                    continue
+                ts = (t - self.start).total_seconds()
+                if not t0 <= ts <= t1:
+                    continue
+                vals = [None] * ncol
+                for name, v in _leaves(smp):
+                    if name in col:
+                        vals[col[name]] = v
+                add(bucket_of(ts), ts, ts, 1, vals, vals, [0.0 if v is None else v for v in vals])
+
+        def visit(k, i):
+            s0, s1, n, mn, mx, sm = self.levels[k].nodes[i]
+            if s1 < t0 or s0 > t1:
+                return
+            if t0 <= s0 and s1 <= t1 and bucket_of(s0) == bucket_of(s1):
+                add(bucket_of(s0), s0, s1, n, mn, mx, sm)
+            elif k == 0:
+                raw(i)
+            else:
+                for j in range(i * self.fanout, min((i + 1) * self.fanout, len(self.levels[k - 1].nodes))):
+                    visit(k - 1, j)
+
+        top = 0 if lvl is None else lvl
+        L = self.levels[top]
+        for i in range(bisect.bisect_left(L.s1, t0), len(L.nodes)):
+            if L.nodes[i][0] > t1:
+                break
+            visit(top, i)
+        for b in sorted(buckets):
+            s0, s1, n, mn, mx, sm = buckets[b]
+            out["t"].append(round(t0 + b * width, 3)); out["s0"].append(s0); out["s1"].append(s1); out["n"].append(n)
+            for c, j in zip(names, cols):
+                out[c]["min"].append(mn[j]); out[c]["max"].append(mx[j])
+                out[c]["mean"].append(round(sm[j] / n, 4) if mn[j] is not None else None)
+        return out
+
+    def samples(self, t0=None, t1=None, channels=None) -> dict:
+        """Every sample in [t0, t1] as columns (seconds from session start, then one list per channel)."""
+        names = channels or self.channels
+        out = {"t": [], **{c: [] for c in names}}
+        for s in self.sample_elements(t0, t1):
+            vals = dict(_leaves(s))
+            out["t"].append(round((_parse_t(s.get("t")) - self.start).total_seconds(), 3))
+            for c in names:
+                out[c].append(vals.get(c))
+        return out
+
+    def sample_elements(self, t0=None, t1=None):
+        """<Sample> elements in [t0, t1], read straight from the byte ranges of the chunks that overlap it."""
+        t0 = 0.0 if t0 is None else float(t0)
+        t1 = self.duration if t1 is None else float(t1)
+        L = self.levels[0]
+        for i in range(bisect.bisect_left(L.s1, t0), len(self.chunks)):
+            c = self.chunks[i]
+            if c["s0"] > t1:
+                break
+            for s in self._read_chunk(c):
+                t = _parse_t(s.get("t"))
+                dt = (t - self.start).total_seconds() if t is not None else None
+                if dt is not None and t0 <= dt <= t1:
+                    yield s
+
+    # --- segment files ---
+    def _segment_file(self, seg):
+        if not self._files:
+            d = os.path.dirname(os.path.abspath(self.xml_path))
+            mpath = manifest_path_for(self.xml_path)
+            if os.path.exists(mpath):
+                with open(mpath, encoding="utf-8") as f:
+                    for s in json.load(f).get("segments", []):
+                        self._files[s["index"]] = os.path.join(d, s["file"])
+            else:
+                self._files[0] = self.xml_path
+        p = self._files.get(seg)
+        if p and not os.path.exists(p) and os.path.exists(p + ".gz"):
+            p = self._files[seg] = p + ".gz"          # compressed since the manifest was read
+        return p
+
+    def _read_chunk(self, c):
+        p = self._segment_file(c["seg"])
+        if not p or not os.path.exists(p):
+            return []
+        live = p == self.xml_path                     # rewritten on every flush: base can move
+        with open_segment(p) as f:                    # .gz: seek decompresses up to the offset
+            base = None if live else self._bases.get(p)
+            if base is None:
+                base = _samples_base(f)
+                if not live:
+                    self._bases[p] = base
+            if base < 0:
+                return []
+            f.seek(base + c["off"])
+            data = f.read(c["end"] - c["off"])
+        try:
+            return list(ET.fromstring(b"<Samples>" + data + b"</Samples>"))
+        except ET.ParseError:
+            return []
+
+
+def _samples_base(f, block=65536):
+    """Byte offset just past '<Samples>' (it follows the events block)."""
+    tag, buf, pos = b"<Samples>", b"", 0
+    while True:
+        data = f.read(block)
+        if not data:
+            return -1
+        buf += data
+        i = buf.find(tag)
+        if i >= 0:
+            return pos + i + len(tag)
+        keep = len(tag) - 1
+        pos += len(buf) - keep
+        buf = buf[-keep:]
+
+
+# ----- CLI -----
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Session time index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="(re)build the index of existing sessions")
+    b.add_argument("xml", nargs="+")
+    b.add_argument("--chunk", type=int, default=CHUNK_SAMPLES)
+    q = sub.add_parser("query", help="print a time range as CSV")
+    q.add_argument("xml")
+    q.add_argument("--from", dest="t0", type=float, help="seconds from session start")
+    q.add_argument("--to", dest="t1", type=float)
+    q.add_argument("--points", type=int, default=200)
+    q.add_argument("--channels", nargs="*", help="default: all (see 'channels')")
+    c = sub.add_parser("channels", help="list indexed channels")
+    c.add_argument("xml")
+    a = ap.parse_args(argv)
+
+    if a.cmd == "build":
+        for p in a.xml:
+            print(build_index(p, a.chunk))
+        return 0
+    idx = SessionIndex(a.xml)
+    if a.cmd == "channels":
+        print(f"{len(idx.chunks)} chunks, {idx.duration:.1f} s, pyramid levels {len(idx.levels)}")
+        print("\n".join(idx.channels))
+        return 0
+    r = idx.query(a.t0, a.t1, a.points, a.channels)
+    names = a.channels or idx.channels
+    print(f"# level {r['level']}", file=sys.stderr)
+    print(",".join(["t_s", "s0", "s1", "n"] + [f"{c}.{k}" for c in names for k in ("min", "max", "mean")]))
+    for i, t in enumerate(r["t"]):
+        print(",".join([f"{t:.3f}", f"{r['s0'][i]:.3f}", f"{r['s1'][i]:.3f}", str(r["n"][i])] + ["" if r[c][k][i] is None else f"{r[c][k][i]:g}"
+                                                      for c in names for k in ("min", "max", "mean")]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+# soak.py
+# Accelerated-clock soak test: synthetic HX711/VL53L1X/BNO055 drivers behind the real
+# SensorReader, XMLLogger (and optionally FSAE_Dashboard), stepped on a virtual clock.
+# 24 h of rig time (across midnight) runs in minutes; RSS, tick latency, file sizes and
+# dropped samples are recorded per virtual interval and checked against limits.
+#   python soak.py --hours 24 --start 23:30 --max-rss-mb 200 --max-p99-ms 50
+#   python soak.py --check-log-writer          (LogWriter idle-flush check only, real time)
+
+import os, io, sys, csv, math, time, random, shutil, argparse, datetime, contextlib
+
+import sensors
+from sensors import SensorReader, HX_COUNTS_PER_LB, UPDATE_MS
+from topology import load_topology
+from xml_logger import XMLLogger, sample_record, LOG_MAX_SAMPLES, LOG_MAX_BYTES
+from log_writer import LogWriter, POLICIES
+from deadline import percentile
+from rig_math import ARM_LENGTH_M, torque_nm
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----- virtual clock -----
+class VirtualClock:
+    def __init__(self, start: datetime.datetime):
+        self.start = start
+        self.elapsed = 0.0
+
+    def advance(self, dt):
+        self.elapsed += dt
+
+    def monotonic(self):
+        return 1000.0 + self.elapsed
+
+    def now(self):
+        return self.start + datetime.timedelta(seconds=self.elapsed)
+
+
+# ----- synthetic drivers (same attributes the Adafruit drivers expose) -----
+class SynthHX:
+    """Load cycles 0 -> peak -> 0 with noise; occasional read failures."""
+    def __init__(self, clock, peak_lbs=1800.0, period_s=90.0, fail_rate=0.001):
+        self.clock, self.peak, self.period, self.fail_rate = clock, peak_lbs, period_s, fail_rate
+
+    def load_lbs(self):
+        ph = (self.clock.elapsed % self.period) / self.period
+        return self.peak * math.sin(math.pi * ph) ** 2
+
+    @property
+    def value(self):
+        if random.random() < self.fail_rate:
+            raise OSError("HX711 timeout")
+        return int((self.load_lbs() + random.gauss(0, 2.0)) * HX_COUNTS_PER_LB)
+
+
+class SynthToF:
+    def __init__(self, hx, station, noise_cm=0.2, dead=False):
+        self.hx, self.station, self.noise, self.dead = hx, station, noise_cm, dead
+        self.distance_mode, self.timing_budget = 1, 50
+
+    @property
+    def data_ready(self):
+        if self.dead:
+            raise OSError("no ACK")
+        return True
+
+    @property
+    def distance(self):
+        # stations further along the chassis see more twist
+        return 30.0 + 0.002 * self.hx.load_lbs() * (self.station + 1) + random.gauss(0, self.noise)
+
+    def clear_interrupt(self): pass
+    def start_ranging(self): pass
+    def stop_ranging(self): pass
+
+
+class SynthBNO:
+    def __init__(self, hx):
+        self.hx = hx
+
+    @property
+    def euler(self):
+        return (0.1, 0.004 * self.hx.load_lbs() + random.gauss(0, 0.02), 180.0)
+
+
+class SyntheticSensorReader(SensorReader):
+    def __init__(self, vclock, dead_channels=(), **kw):
+        self._vclock, self._dead = vclock, set(dead_channels)
+        super().__init__(clock=vclock.monotonic, start=False, **kw)
+
+    def _init_hardware(self):
+        self._hx_chan = SynthHX(self._vclock)
+        for i in range(len(self.topology)):
+            self._try_open_tof(i)
+        self._bno = SynthBNO(self._hx_chan)
+
+    def _open_tof(self, i):
+        return SynthToF(self._hx_chan, i, dead=i in self._dead)
+
+    def _tare(self):
+        self._hx_zero = 0
+
+
+# ----- measurement helpers -----
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource      # peak, not current, where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+class _CountingSink(io.TextIOBase):
+    """Swallows console output during the run but counts the lines."""
+    def __init__(self): self.lines = 0
+    def write(self, s):
+        self.lines += s.count("\n"); return len(s)
+
+
+class _NullLogger:
+    """Just enough XMLLogger for LogWriter: counts what reaches it."""
+    flush_every = 1
+    def __init__(self): self.written = 0
+    def _now(self): return datetime.datetime.now().isoformat(timespec="milliseconds")
+    def add_sample(self, data, t=None): self.written += 1
+    def add_event(self, etype, meta=None, t=None, flush=True): self.written += 1
+    def flush(self): pass
+
+def check_flush_interval(interval_s=0.2):
+    """A lone item on an idle LogWriter must be written within its flush interval, not at batch_max."""
+    sink = _NullLogger()
+    w = LogWriter(sink, flush_interval_s=interval_s)
+    time.sleep(interval_s)                          # let the writer settle into its idle wait
+    w.add_sample({})
+    deadline = time.monotonic() + interval_s * 2    # one interval plus scheduling slack
+    while sink.written == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    ok = sink.written == 1
+    w.close()
+    return None if ok else f"LogWriter held a lone sample past its {interval_s:g} s flush interval"
+
+
+# ----- harness -----
+class Soak:
+    def __init__(self, a):
+        self.a = a
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time.fromisoformat(a.start))
+        self.clock = VirtualClock(start)
+        self.out_dir = os.path.join(BASE_DIR, a.out)
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+        self.logger = XMLLogger("soak_session.xml", {"rig": "soak", "mode": "synthetic"},
+                                rotate_daily=True, subdir_name=a.out, clock=self.clock.now,
+                                max_samples=a.log_max_samples or None, max_bytes=a.log_max_bytes or None)
+        self.logger.flush_every = a.flush_every
+        # accelerated time outruns a real-time writer, so soak blocks instead of dropping by default
+        self.log = None if a.sync_log else LogWriter(self.logger, policy=a.overflow,
+                                                     flush_interval_s=a.flush_interval)
+        self.sensors = SyntheticSensorReader(self.clock, dead_channels=a.dead, target_hz=a.hz,
+                                             topology=load_topology(a.topology))
+        self.app = None
+        if a.ui:
+            import tkinter as tk
+            import dashboard
+            self.tk = tk.Tk()
+            self.app = dashboard.FSAE_Dashboard(self.tk, sensors=self.sensors, logger=self.logger, autotick=False)
+            self.log = self.app.log
+        self.expected = 0
+        self.failures = []
+
+    def ui_tick(self):
+        if self.app:
+            self.app.tick(); self.tk.update()
+            return
+        s = self.sensors
+        rf = float(s.force_lbs); ra = float(s.angle_deg); rt = torque_nm(rf, ARM_LENGTH_M)
+        rec = sample_record((rf, ra, rt), s.angles_tof_deg, s.bno_euler_deg, (rf, ra, rt), s.t_step)
+        (self.log or self.logger).add_sample(rec)
+
+    def logged(self):
+        return self.logger.sample_count
+
+    def dropped(self):
+        return self.log.dropped if self.log else self.expected - self.logger.sample_count
+
+    def files_kb(self):
+        live = os.path.getsize(self.logger.path) / 1e3
+        total = sum(os.path.getsize(os.path.join(self.out_dir, n)) for n in os.listdir(self.out_dir)) / 1e3
+        return live, total
+
+    def check(self, row):
+        a, bad = self.a, []
+        if a.max_rss_mb and row["rss_mb"] > a.max_rss_mb: bad.append(f"RSS {row['rss_mb']:.1f} MB > {a.max_rss_mb}")
+        if a.max_p99_ms and row["tick_p99_ms"] > a.max_p99_ms: bad.append(f"tick p99 {row['tick_p99_ms']:.2f} ms > {a.max_p99_ms}")
+        if a.max_live_kb and row["live_kb"] > a.max_live_kb: bad.append(f"live file {row['live_kb']:.0f} kB > {a.max_live_kb}")
+        if a.max_dropped >= 0 and row["dropped"] > a.max_dropped: bad.append(f"dropped {row['dropped']} > {a.max_dropped}")
+        for b in bad:
+            self.failures.append(f"[{row['virtual_time']}] {b}")
+        return not bad
+
+    def run(self):
+        a, clk = self.a, self.clock
+        dt = 1.0 / a.hz
+        ui_every = max(1, round(UPDATE_MS / 1000.0 / dt))
+        report_every = max(1, round(a.report_s / dt))
+        total_steps = int(a.hours * 3600 / dt)
+        step_lat, tick_lat, rows = [], [], []
+        sink = _CountingSink()
+        wall0 = time.perf_counter()
+
+        with open(os.path.join(self.out_dir, "soak_report.csv"), "w", newline="") as rf, \
+                contextlib.redirect_stdout(sink):
+            w = None
+            for k in range(1, total_steps + 1):
+                clk.advance(dt)
+                t0 = time.perf_counter()
+                self.sensors._step()
+                step_lat.append(time.perf_counter() - t0)
+                if k % ui_every == 0:
+                    self.expected += 1
+                    t0 = time.perf_counter()
+                    self.ui_tick()
+                    tick_lat.append(time.perf_counter() - t0)
+                if k % report_every == 0 or k == total_steps:
+                    live, total = self.files_kb()
+                    row = {"virtual_time": clk.now().isoformat(timespec="seconds"),
+                           "wall_s": round(time.perf_counter() - wall0, 2),
+                           "rss_mb": round(rss_mb(), 2),
+                           "step_p99_ms": round(percentile(step_lat, 0.99) * 1e3, 3),
+                           "tick_p50_ms": round(percentile(tick_lat, 0.50) * 1e3, 3),
+                           "tick_p95_ms": round(percentile(tick_lat, 0.95) * 1e3, 3),
+                           "tick_p99_ms": round(percentile(tick_lat, 0.99) * 1e3, 3),
+                           "tick_max_ms": round(max(tick_lat, default=0.0) * 1e3, 3),
+                           "live_kb": round(live, 1), "total_kb": round(total, 1),
+                           "segments": self.logger.segment + 1,
+                           "logged": self.logged(), "dropped": self.dropped(),
+                           "queue_max": self.log.max_depth if self.log else 0,
+                           "write_max_ms": round(self.log.max_write_ms, 2) if self.log else 0.0,
+                           "console_lines": sink.lines}
+                    if w is None:
+                        w = csv.DictWriter(rf, fieldnames=list(row)); w.writeheader()
+                    w.writerow(row); rf.flush()
+                    rows.append(row)
+                    step_lat.clear(); tick_lat.clear()
+                    ok = self.check(row)
+                    print(f"{row['virtual_time']}  rss={row['rss_mb']:.1f}MB  p99={row['tick_p99_ms']:.2f}ms  "
+                          f"live={row['live_kb']:.0f}kB  seg={row['segments']}  dropped={row['dropped']}"
+                          f"{'' if ok else '  FAIL'}", file=sys.__stdout__, flush=True)
+                    if not ok and a.fail_fast:
+                        break
+
+        if self.app:
+            self.app.capture.close(); self.tk.destroy()
+        if self.log:
+            self.log.close()
+        self.logger.close()
+        self.check_midnights()
+        return rows
+
+    def check_midnights(self):
+        """Every midnight crossed must end a "daily" segment before it and start the next one after it."""
+        segs = self.logger.segments()
+        t = lambda s: datetime.datetime.fromisoformat(s) if s else None
+        day = self.clock.start.date()
+        while day < self.clock.now().date():
+            day += datetime.timedelta(days=1)
+            midnight = datetime.datetime.combine(day, datetime.time())
+            if not any(cur.get("reason") == "daily" and cur["last_t"] and nxt["first_t"]
+                       and t(cur["last_t"]) < midnight <= t(nxt["first_t"])
+                       for cur, nxt in zip(segs, segs[1:])):
+                self.failures.append(f"no daily segment boundary at {midnight:%Y-%m-%d %H:%M} "
+                                     f"(segments: {[(s.get('reason'), s['first_t'], s['last_t']) for s in segs]})")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Accelerated-clock soak test for the torsion rig pipeline")
+    ap.add_argument("--hours", type=float, default=24.0, help="virtual hours to simulate")
+    ap.add_argument("--start", default="23:30", help="virtual start time of day (crosses midnight by default)")
+    ap.add_argument("--hz", type=float, default=sensors.TARGET_HZ, help="acquisition rate")
+    ap.add_argument("--report-s", type=float, default=600.0, help="virtual seconds per report row")
+    ap.add_argument("--flush-every", type=int, default=1, help="with --sync-log only")
+    ap.add_argument("--sync-log", action="store_true", help="log on the tick thread (pre-LogWriter behaviour)")
+    ap.add_argument("--overflow", choices=POLICIES, default="block")
+    ap.add_argument("--flush-interval", type=float, default=1.0, help="LogWriter batch interval (real seconds)")
+    ap.add_argument("--log-max-samples", type=int, default=LOG_MAX_SAMPLES, help="0 = no sample rotation")
+    ap.add_argument("--log-max-bytes", type=int, default=LOG_MAX_BYTES, help="0 = no size rotation")
+    ap.add_argument("--dead", type=int, nargs="*", default=[], help="ToF channels (0-based) that never answer")
+    ap.add_argument("--topology", help="topology JSON (default: topology.py lookup)")
+    ap.add_argument("--ui", action="store_true", help="drive FSAE_Dashboard.tick() too (needs a display)")
+    ap.add_argument("--out", default="soak files", help="output subfolder of this script's folder (wiped first)")
+    ap.add_argument("--max-rss-mb", type=float, default=150.0, help="0 = no limit")
+    ap.add_argument("--max-p99-ms", type=float, default=UPDATE_MS / 4, help="UI tick p99; 0 = no limit")
+    ap.add_argument("--max-live-kb", type=float, default=LOG_MAX_BYTES * 1.5 / 1e3,
+                    help="live XML size (rotation should keep it near --log-max-bytes); 0 = no limit")
+    ap.add_argument("--max-dropped", type=int, default=0, help="-1 = no limit")
+    ap.add_argument("--fail-fast", action="store_true")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--check-log-writer", action="store_true",
+                    help="only run the LogWriter flush-interval check (real-time sleeps) and exit")
+    a = ap.parse_args(argv)
+    if a.check_log_writer:
+        err = check_flush_interval()
+        print(f"CHECK FAILED: {err}" if err else "CHECK OK — LogWriter flushes a lone sample within its interval")
+        return 1 if err else 0
+    out = os.path.realpath(os.path.join(BASE_DIR, a.out))
+    if os.path.dirname(out) != os.path.realpath(BASE_DIR):
+        ap.error("--out must be a folder directly under the script's folder (it is wiped)")
+    random.seed(a.seed)
+
+    soak = Soak(a)
+    soak.run()
+    if soak.failures:
+        print("SOAK FAILED:"); print("\n".join("  " + f for f in soak.failures))
+        return 1
+    print(f"SOAK OK — report: {os.path.join(soak.out_dir, 'soak_report.csv')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# tof_scheduler.py
+# Per-channel VL53L1X timing budget / distance mode picker.
+# Noise is estimated from successive differences (the rig deflects slowly, so
+# sample-to-sample scatter is mostly sensor noise). Quiet channels get a shorter
+# budget, noisy ones a longer one, never longer than the target rate allows.
+
+import time
+from collections import deque
+
+TIMING_BUDGETS_MS = (20, 33, 50, 100, 200, 500)    # values the Adafruit driver accepts in both modes
+SHORT, LONG = 1, 2                                 # VL53L1X.distance_mode
+SHORT_MAX_CM = 120.0      # short mode is good to ~1.3 m; go long above this...
+LONG_BACK_CM = 100.0      # ...and back to short below this
+
+
+class ChannelTiming:
+    def __init__(self, budget_ms, mode):
+        self.budget_ms = budget_ms
+        self.mode = mode
+        self.mean_cm = None
+        self.noise_var = 0.0        # EW variance of the measurement noise, cm^2
+        self.rate_hz = 0.0          # EW rate of fresh readings
+        self.stable = 0             # consecutive quiet readings
+        self.settle = 0             # readings to ignore after a change
+        self.reads = 0
+        self._last_d = None
+        self._last_t = None
+
+    @property
+    def noise_cm(self):
+        return self.noise_var ** 0.5
+
+
+class ToFScheduler:
+    def __init__(self, channels, target_hz, noise_hi_cm=0.5, noise_lo_cm=0.15,
+                 initial_budget_ms=50, stable_reads=40, alpha=0.1, max_budget_ms=None):
+        self.target_hz = float(target_hz)
+        self.noise_hi, self.noise_lo = float(noise_hi_cm), float(noise_lo_cm)
+        self.stable_reads = int(stable_reads)
+        self.alpha = float(alpha)
+        # each sensor ranges on its own, so one budget must fit in one output period
+        cap = max_budget_ms or 1000.0 / self.target_hz
+        self.budgets = [b for b in TIMING_BUDGETS_MS if b <= cap] or [TIMING_BUDGETS_MS[0]]
+        b0 = max([b for b in self.budgets if b <= initial_budget_ms] or [self.budgets[0]])
+        self.ch = [ChannelTiming(b0, SHORT) for _ in range(channels)]
+        self._changes = deque()
+
+    # --- public ---
+    def initial(self, i):
+        return self.ch[i].budget_ms, self.ch[i].mode
+
+    def apply(self, i, sensor):
+        """Push channel i's settings to a VL53L1X (ranging is restarted)."""
+        c = self.ch[i]
+        sensor.stop_ranging()
+        sensor.distance_mode = c.mode
+        sensor.timing_budget = c.budget_ms
+        sensor.start_ranging()
+
+    def update(self, i, distance_cm, now=None) -> bool:
+        """Feed one fresh reading; True if channel i's settings changed and need apply()."""
+        now = time.monotonic() if now is None else now
+        c = self.ch[i]
+        c.reads += 1
+        if c._last_t is not None and now > c._last_t:
+            inst = 1.0 / (now - c._last_t)
+            c.rate_hz = inst if c.rate_hz == 0.0 else c.rate_hz + self.alpha * (inst - c.rate_hz)
+        c._last_t = now
+        c.mean_cm = distance_cm if c.mean_cm is None else c.mean_cm + self.alpha * (distance_cm - c.mean_cm)
+        if c._last_d is not None:
+            # var(d_k - d_k-1) = 2 * noise var for a slow signal
+            c.noise_var += self.alpha * (0.5 * (distance_cm - c._last_d) ** 2 - c.noise_var)
+        c._last_d = distance_cm
+
+        if c.settle > 0:
+            c.settle -= 1
+            return False
+
+        mode = c.mode
+        if c.mode == SHORT and c.mean_cm > SHORT_MAX_CM: mode = LONG
+        elif c.mode == LONG and c.mean_cm < LONG_BACK_CM: mode = SHORT
+
+        k = self.budgets.index(c.budget_ms) if c.budget_ms in self.budgets else 0
+        noise = c.noise_cm
+        if noise > self.noise_hi:
+            c.stable = 0
+            k = min(k + 1, len(self.budgets) - 1)
+        elif noise < self.noise_lo:
+            c.stable += 1
+            if c.stable >= self.stable_reads:
+                c.stable = 0
+                k = max(k - 1, 0)
+        else:
+            c.stable = 0
+
+        budget = self.budgets[k]
+        if budget == c.budget_ms and mode == c.mode:
+            return False
+        self._changes.append({"channel": f"S{i+1}", "budget_ms": budget, "mode": "short" if mode == SHORT else "long",
+                              "noise_cm": round(noise, 3), "distance_cm": round(c.mean_cm, 1)})
+        c.budget_ms, c.mode = budget, mode
+        c.settle = 5                        # first readings after a restart are not representative
+        c._last_d = None
+        return True
+
+    def pop_changes(self):
+        out = []
+        while self._changes:
+            out.append(self._changes.popleft())
+        return out
+
+    def report(self):
+        """Per-channel settings, achieved fresh-reading rate and noise variance."""
+        return [{"channel": f"S{i+1}", "budget_ms": c.budget_ms, "mode": "short" if c.mode == SHORT else "long",
+                 "rate_hz": round(c.rate_hz, 2), "noise_var_cm2": round(c.noise_var, 4),
+                 "distance_cm": None if c.mean_cm is None else round(c.mean_cm, 2),
+                 "noise_limited": c.noise_cm > self.noise_hi and c.budget_ms == self.budgets[-1]}
+                for i, c in enumerate(self.ch)]
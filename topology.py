@@ -0,0 +1,99 @@
+# topology.py
+# Where the ToF stations are: I2C buses -> TCA9548A muxes (by address) -> mux channels.
+# Stations are numbered S1..Sn in file order; everything that used to assume 8 sizes from this.
+# Loaded from topology.json next to this script (or $RIG_TOPOLOGY) if present, e.g.
+#   {"buses": [
+#       {"bus": null, "muxes": [{"address": "0x70", "channels": [0,1,2,3,4,5,6,7]}]},
+#       {"bus": 3,    "muxes": [{"address": "0x70", "channels": [0,1,2,3]},
+#                               {"address": "0x71", "channels": [0,1]}]}]}
+# "bus": null is the Blinka default (BLINKA_I2C); a number is /dev/i2c-N via adafruit_extended_bus.
+# Muxes sharing a bus are safe: the TCA9548A driver deselects its channel on unlock.
+
+import os, json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TOPOLOGY_PATH = os.environ.get("RIG_TOPOLOGY", os.path.join(BASE_DIR, "topology.json"))
+TCA_DEFAULT_ADDRESS = 0x70
+
+DEFAULT_TOPOLOGY = {"buses": [{"bus": None, "muxes": [{"address": TCA_DEFAULT_ADDRESS, "channels": list(range(8))}]}]}
+
+
+class Station:
+    def __init__(self, index, bus, mux_address, channel):
+        self.index = index
+        self.name = f"S{index + 1}"
+        self.bus = bus
+        self.mux_address = mux_address
+        self.channel = channel
+
+    def __repr__(self):
+        bus = "default" if self.bus is None else self.bus
+        return f"{self.name}(bus={bus}, mux={self.mux_address:#04x}, ch={self.channel})"
+
+
+class Topology:
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.stations = []
+        for b in spec.get("buses", []):
+            for m in b.get("muxes", []):
+                addr = m.get("address", TCA_DEFAULT_ADDRESS)
+                addr = int(addr, 0) if isinstance(addr, str) else int(addr)
+                for ch in m.get("channels", range(8)):
+                    self.stations.append(Station(len(self.stations), b.get("bus"), addr, int(ch)))
+        if len({(s.bus, s.mux_address, s.channel) for s in self.stations}) != len(self.stations):
+            raise ValueError("topology lists the same bus/mux/channel twice")
+
+    def __len__(self):
+        return len(self.stations)
+
+    @property
+    def buses(self):
+        """Bus ids in first-seen order."""
+        return list(dict.fromkeys(s.bus for s in self.stations))
+
+    def stations_on(self, bus):
+        return [s for s in self.stations if s.bus == bus]
+
+    def names(self):
+        return [s.name for s in self.stations]
+
+    def describe(self):
+        return f"{len(self)}x ToF on {len(self.buses)} bus(es)"
+
+
+def load_topology(path: str | None = None) -> Topology:
+    path = path or TOPOLOGY_PATH
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return Topology(json.load(f))
+    return Topology(DEFAULT_TOPOLOGY)
+
+
+# ----- hardware (imported only when a bus is actually opened) -----
+def open_bus(bus):
+    if bus is None:
+        import board, busio
+        return busio.I2C(board.SCL, board.SDA)
+    from adafruit_extended_bus import ExtendedI2C
+    return ExtendedI2C(int(bus))
+
+def open_channels(topo: Topology):
+    """I2C channel object per station (None where the bus or mux could not be opened)."""
+    from adafruit_tca9548a import TCA9548A
+    out = [None] * len(topo)
+    for bus in topo.buses:
+        try:
+            i2c = open_bus(bus)
+        except Exception as e:
+            print(f"[topology] bus {bus}: {e}")
+            continue
+        muxes = {}
+        for s in topo.stations_on(bus):
+            try:
+                if s.mux_address not in muxes:
+                    muxes[s.mux_address] = TCA9548A(i2c, address=s.mux_address)
+                out[s.index] = muxes[s.mux_address][s.channel]
+            except Exception as e:
+                print(f"[topology] {s}: {e}")
+    return out
@@ -0,0 +1,175 @@
+# triggers.py
+# Pre/post-trigger capture on top of SensorReader.
+# Keeps the last few seconds of full-rate samples in memory; when a trigger fires
+# (force level, force slope, angle jump, sensor dropout) the window around it is
+# written to its own CSV and an event is queued for the session log.
+
+import os, csv, datetime, threading, queue
+from collections import deque
+
+
+# ----- triggers: check(sample, prev) -> dict (why it fired) or None -----
+class ForceThreshold:
+    name = "ForceThreshold"
+
+    def __init__(self, level_lbs, hysteresis_lbs=50.0):
+        self.level, self.hyst = float(level_lbs), float(hysteresis_lbs)
+        self._armed = True
+
+    def check(self, s, prev):
+        f = s["force_lbs"]
+        if self._armed and f >= self.level:
+            self._armed = False
+            return {"force_lbs": round(f, 2), "level_lbs": self.level}
+        if not self._armed and f < self.level - self.hyst:
+            self._armed = True
+        return None
+
+
+class ForceSlope:
+    name = "ForceSlope"
+
+    def __init__(self, lbs_per_s):
+        self.limit = float(lbs_per_s)
+
+    def check(self, s, prev):
+        if prev is None or s["t"] <= prev["t"]:
+            return None
+        slope = (s["force_lbs"] - prev["force_lbs"]) / (s["t"] - prev["t"])
+        if abs(slope) >= self.limit:
+            return {"slope_lbs_s": round(slope, 1), "limit_lbs_s": self.limit}
+        return None
+
+
+class AngleJump:
+    name = "AngleJump"
+
+    def __init__(self, deg):
+        self.limit = float(deg)
+
+    def check(self, s, prev):
+        if prev is None:
+            return None
+        jumps = {"selected": s["angle_deg"] - prev["angle_deg"]}
+        for i, (a, b, on) in enumerate(zip(s["tof_deg"], prev["tof_deg"], s["tof_active"])):
+            if on:
+                jumps[f"S{i+1}"] = a - b
+        src, d = max(jumps.items(), key=lambda kv: abs(kv[1]))
+        if abs(d) >= self.limit:
+            return {"source": src, "jump_deg": round(d, 3), "limit_deg": self.limit}
+        return None
+
+
+class SensorDropout:
+    """Fires once when the load cell or an active ToF stops returning good reads."""
+    name = "SensorDropout"
+
+    def __init__(self, timeout_s=1.0):
+        self.timeout = float(timeout_s)
+        self._down = set()
+
+    def check(self, s, prev):
+        now, fired = s["t"], []
+        last = [("HX711", s["force_last_ok"])]
+        last += [(f"S{i+1}", t) for i, (t, on) in enumerate(zip(s["tof_last_ok"], s["tof_active"])) if on]
+        for name, t_ok in last:
+            down = t_ok > 0 and now - t_ok > self.timeout
+            if down and name not in self._down:
+                fired.append(name)
+            if down: self._down.add(name)
+            else: self._down.discard(name)
+        return {"sensors": ",".join(fired), "timeout_s": self.timeout} if fired else None
+
+
+# ----- capture -----
+class TriggerCapture:
+    def __init__(self, sensors, triggers, out_dir, session_name="session",
+                 pre_s=2.0, post_s=2.0, rate_hz=None, holdoff_s=1.0):
+        self.sensors = sensors
+        self.triggers = list(triggers)
+        self.out_dir = out_dir
+        self.session_name = session_name
+        self.pre_s, self.post_s, self.holdoff_s = float(pre_s), float(post_s), float(holdoff_s)
+        rate = rate_hz or 1.0 / sensors._dt
+        self._ring = deque(maxlen=max(1, int(round(self.pre_s * rate))))
+        self._prev = None
+        self._active = None                 # capture in progress: dict
+        self._quiet_until = 0.0
+        self._events = deque()              # (etype, meta) for the session log, drained by the UI thread
+        self.capture_count = 0
+
+        self._q = queue.Queue()
+        self._th = threading.Thread(target=self._writer, daemon=True)
+        self._th.start()
+        sensors.add_listener(self._on_sample)
+
+    # --- public ---
+    def pop_events(self):
+        out = []
+        while self._events:
+            out.append(self._events.popleft())
+        return out
+
+    def close(self):
+        self.sensors.remove_listener(self._on_sample)
+        if self._active:                    # keep a cut-short capture rather than losing it
+            self._finish()
+        self._q.put(None)
+        self._th.join(timeout=5.0)
+
+    # --- acquisition thread ---
+    def _on_sample(self, s):
+        prev, self._prev = self._prev, s
+        if self._active:
+            self._active["post"].append(s)
+            if s["t"] - self._active["t0"] >= self.post_s:
+                self._finish()
+            return
+        self._ring.append(s)
+        if s["t"] < self._quiet_until:
+            return
+        for trig in self.triggers:
+            why = trig.check(s, prev)
+            if why is not None:
+                self._start(trig.name, why, s)
+                return
+
+    def _start(self, name, why, s):
+        self.capture_count += 1
+        stamp = datetime.datetime.now()
+        fname = f"{self.session_name}_{stamp:%Y%m%d-%H%M%S}_{self.capture_count:03d}_{name}.csv"
+        self._active = {"name": name, "why": why, "t0": s["t"], "wall": stamp,
+                        "pre": list(self._ring), "post": [], "file": os.path.join(self.out_dir, fname)}
+        self._ring.clear()
+
+    def _finish(self):
+        cap, self._active = self._active, None
+        self._quiet_until = cap["post"][-1]["t"] + self.holdoff_s if cap["post"] else 0.0
+        self._q.put(cap)
+        meta = {"trigger": cap["name"], "file": os.path.basename(cap["file"]),
+                "pre_s": self.pre_s, "post_s": self.post_s,
+                "samples": len(cap["pre"]) + len(cap["post"]),
+                "at": cap["wall"].isoformat(timespec="milliseconds")}
+        meta.update(cap["why"])
+        self._events.append(("Trigger", meta))
+
+    # --- writer thread ---
+    def _writer(self):
+        while True:
+            cap = self._q.get()
+            if cap is None:
+                return
+            try:
+                os.makedirs(self.out_dir, exist_ok=True)
+                rows = cap["pre"] + cap["post"]
+                n = len(rows[0]["tof_deg"]) if rows else 0
+                with open(cap["file"], "w", newline="", encoding="utf-8") as f:
+                    w = csv.writer(f)
+                    w.writerow(["t_rel_s", "Force_lbs", "Force_raw", "Angle_deg_selected"]
+                               + [f"ToF{i+1}_deg" for i in range(n)] + ["roll_deg", "pitch_deg", "yaw_deg"])
+                    for r in rows:
+                        w.writerow([f"{r['t'] - cap['t0']:.4f}", round(r["force_lbs"], 2), r["force_raw"],
+                                    round(r["angle_deg"], 3)] + [round(a, 3) for a in r["tof_deg"]]
+                                   + [round(r["bno"].get(k, 0.0), 3) for k in ("roll", "pitch", "yaw")])
+            except Exception as e:
+                print(f"[trigger] capture write failed: {e}")
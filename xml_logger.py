@@ -1,53 +1,111 @@
 # xml_logger.py
 # Saves samples to XML inside "xml files" next to this script.
 # Atomic writes in the same directory (Pi/Windows safe). Supports events.
+# Rotates by day, size or sample count; closed segments are gzipped in the
+# background and listed in order in "<name>.manifest.json". With index=True a time index
+# is kept alongside in "<name>.index.jsonl" (see session_index.py).
+# Every run gets its own files: the start time is added to the name ("torsion_session.xml"
+# -> "torsion_session_20261019-143005.xml") so a later run never overwrites an earlier one.
 
-import os, datetime, tempfile, xml.etree.ElementTree as ET
+import os, csv, gzip, json, shutil, datetime, tempfile, threading, queue, xml.etree.ElementTree as ET
+
+# Segment caps for the dashboard, headless and soak runs. Every flush rewrites the whole live
+# segment, so these bound the per-flush write and serialisation time.
+LOG_MAX_SAMPLES = 3000
+LOG_MAX_BYTES = 2_000_000
 
 class XMLLogger:
-    def __init__(self, path, session_meta=None, rotate_daily=True, subdir_name="xml files"):
+    def __init__(self, path, session_meta=None, rotate_daily=True, subdir_name="xml files",
+                 max_bytes=None, max_samples=None, compress=True, clock=None, index=True, stamp=True):
         filename = os.path.basename(path)
         base_dir = os.path.dirname(os.path.abspath(__file__))
         target_dir = os.path.join(base_dir, subdir_name) if subdir_name else base_dir
         os.makedirs(target_dir, exist_ok=True)
+        self._clock = clock or datetime.datetime.now     # swapped for a virtual clock in soak tests
 
+        if stamp:
+            stem, ext = os.path.splitext(filename)
+            filename = _unused_name(target_dir, f"{stem}_{self._clock():%Y%m%d-%H%M%S}", ext)
         self.path = os.path.join(target_dir, filename)
+        self.manifest_path = manifest_path_for(self.path)
         self.rotate_daily = rotate_daily
-        self.flush_every = 1
+        self.max_bytes = max_bytes          # rotate once the live file reaches this size
+        self.max_samples = max_samples      # rotate once a segment holds this many samples
+        self.compress = compress
+        self.flush_every = 1                # 0 = only when flush() is called (see log_writer.py)
         self.sample_count = 0
-        self._last_day = datetime.date.today()
+        self._last_day = self._clock().date()
 
-        self.root = ET.Element("Session")
-        if session_meta:
-            for k, v in session_meta.items():
-                self.root.set(k, str(v))
-        self.events = ET.SubElement(self.root, "Events")
-        self.samples = ET.SubElement(self.root, "Samples")
+        self.session_meta = dict(session_meta or {})
+        self.segment = 0
+        self._seg_samples = 0
+        self._seg_first_t = None
+        self._seg_last_t = None
+        self._bytes = 0
+        self._closed_segments = []
 
+        self._manifest_lock = threading.Lock()
+        self._gz_q = queue.Queue()
+        self._gz_th = None
+
+        self._index = None
+        if index:
+            from session_index import SessionIndexWriter    # imports this module
+            self._index = SessionIndexWriter(self.path)
+
+        self._new_root()
         self._write_atomic()
+        self._write_manifest()
 
     # --- public ---
-    def add_sample(self, data: dict):
-        s = ET.SubElement(self.samples, "Sample", {"t": self._now()})
+    def add_sample(self, data: dict, t: str | None = None):
+        t = t or self._now()
+        self._maybe_rotate(t)
+        s = ET.SubElement(self.samples, "Sample", {"t": t})
         self._dict_to_xml(s, data)
+        if self._index:
+            self._index.add(self.segment, s)
         self.sample_count += 1
-        self._maybe_rotate()
-        if self.sample_count % self.flush_every == 0:
+        self._seg_samples += 1
+        self._seg_first_t = self._seg_first_t or t
+        self._seg_last_t = t
+        if self.flush_every and self.sample_count % self.flush_every == 0:
             self.flush()
 
-    def add_event(self, etype: str, meta: dict | None = None):
-        e = ET.SubElement(self.events, "Event", {"t": self._now(), "type": etype})
+    def add_event(self, etype: str, meta: dict | None = None, t: str | None = None, flush: bool = True):
+        e = ET.SubElement(self.events, "Event", {"t": t or self._now(), "type": etype})
         if meta:
             self._dict_to_xml(e, meta)
-        self.flush()
+        if flush:
+            self.flush()
 
     def flush(self):
         self._write_atomic()
 
     def close(self):
         self.flush()
+        if self._index:
+            self._index.close()
+        self._write_manifest()
+        if self._gz_th:
+            self._gz_q.put(None)
+            self._gz_th.join()
+            self._gz_th = None
+
+    def segments(self):
+        """Closed segments in order, followed by the live file."""
+        with self._manifest_lock:
+            return [dict(s) for s in self._closed_segments] + [self._live_entry()]
 
     # --- helpers ---
+    def _new_root(self):
+        self.root = ET.Element("Session")
+        for k, v in self.session_meta.items():
+            self.root.set(k, str(v))
+        self.root.set("segment", str(self.segment))
+        self.events = ET.SubElement(self.root, "Events")
+        self.samples = ET.SubElement(self.root, "Samples")
+
     def _dict_to_xml(self, parent, d: dict):
         for k, v in d.items():
             if isinstance(v, dict):
@@ -62,24 +120,195 @@ class XMLLogger:
         try:
             with os.fdopen(fd, "wb") as f:
                 ET.ElementTree(self.root).write(f, encoding="utf-8", xml_declaration=True)
+                self._bytes = f.tell()
             os.replace(tmp, self.path)
+            if self._index:
+                self._index.commit()        # index lines only ever point at bytes on disk
         finally:
             if os.path.exists(tmp) and tmp != self.path:
                 try: os.remove(tmp)
                 except: pass
 
-    def _maybe_rotate(self):
-        if not self.rotate_daily:
-            return
-        today = datetime.date.today()
-        if today != self._last_day:
-            base, ext = os.path.splitext(self.path)
-            rotated = f"{base}.{self._last_day.isoformat()}{ext}"
-            try: os.replace(self.path, rotated)
-            except FileNotFoundError: pass
-            self._last_day = today
+    def _maybe_rotate(self, t: str | None = None):
+        # the day is the sample's own (LogWriter stamps at enqueue), not whenever it gets written
+        try: today = datetime.datetime.fromisoformat(t).date()
+        except (TypeError, ValueError): today = self._clock().date()
+        reason = None
+        if self.rotate_daily and today != self._last_day:
+            reason = "daily"
+        elif self.max_samples and self._seg_samples >= self.max_samples:
+            reason = "samples"
+        elif self.max_bytes and self._bytes >= self.max_bytes:
+            reason = "size"
+        if reason:
+            self._rotate(reason)
+        self._last_day = today
+
+    def _rotate(self, reason):
+        # finish the live segment, move it aside, carry on in a fresh tree
+        if self._index:
+            self._index.end_segment()
+        self._write_atomic()
+        base, ext = os.path.splitext(self.path)
+        rotated = f"{base}.{self._last_day.isoformat()}.{self.segment:03d}{ext}"
+        if os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            # only possible with stamp=False and a reused name: keep the old segment
+            d, name = os.path.split(rotated)
+            rotated = os.path.join(d, _unused_name(d, os.path.splitext(name)[0], ext))
+        try: os.replace(self.path, rotated)
+        except FileNotFoundError: return
+        entry = self._live_entry()
+        entry.update(file=os.path.basename(rotated), reason=reason, live=False)
+        with self._manifest_lock:
+            self._closed_segments.append(entry)
+
+        self.segment += 1
+        self._seg_samples = 0
+        self._seg_first_t = self._seg_last_t = None
+        self._new_root()
+        self._write_atomic()
+        self._write_manifest()
+        if self.compress:
+            self._compress_later(entry)
+
+    def _live_entry(self):
+        return {"index": self.segment, "file": os.path.basename(self.path), "samples": self._seg_samples,
+                "first_t": self._seg_first_t, "last_t": self._seg_last_t, "live": True}
+
+    def _compress_later(self, entry):
+        if self._gz_th is None:
+            self._gz_th = threading.Thread(target=self._gz_loop, daemon=True)
+            self._gz_th.start()
+        self._gz_q.put(entry)
+
+    def _gz_loop(self):
+        while True:
+            entry = self._gz_q.get()
+            if entry is None:
+                return
+            src = os.path.join(os.path.dirname(self.path), entry["file"])
+            try:
+                with open(src, "rb") as fi, gzip.open(src + ".gz", "wb") as fo:
+                    shutil.copyfileobj(fi, fo)
+                os.remove(src)
+            except OSError:
+                continue
+            with self._manifest_lock:
+                entry["file"] += ".gz"
+            self._write_manifest()
+
+    def _write_manifest(self):
+        with self._manifest_lock:
+            doc = {"session": self.session_meta, "live": os.path.basename(self.path),
+                   "segments": [dict(s) for s in self._closed_segments] + [self._live_entry()]}
+            dirpath = os.path.dirname(self.manifest_path)
+            fd, tmp = tempfile.mkstemp(prefix="mantmp_", suffix=".json", dir=dirpath)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(doc, f, indent=1)
+                os.replace(tmp, self.manifest_path)
+            finally:
+                if os.path.exists(tmp):
+                    try: os.remove(tmp)
+                    except: pass
 
     def _now(self):
-        return datetime.datetime.now().isoformat(timespec="milliseconds")
+        return self._clock().isoformat(timespec="milliseconds")
+
+
+def _unused_name(dirpath, stem, ext):
+    """stem+ext, or stem-2+ext, stem-3+ext... whichever has no file (or .gz) yet."""
+    name, k = f"{stem}{ext}", 1
+    while os.path.exists(os.path.join(dirpath, name)) or os.path.exists(os.path.join(dirpath, name + ".gz")):
+        k += 1
+        name = f"{stem}-{k}{ext}"
+    return name
+
+
+# ----- sample layout shared by the dashboard and headless tools -----
+def sample_record(raw, tof_angles, bno, display, timing=None) -> dict:
+    """raw/display: (force_lbs, angle_deg, torque_Nm); bno: {"roll","pitch","yaw"};
+    timing: (scheduled, actual) acquisition time on the reader's monotonic clock."""
+    rf, ra, rt = raw
+    df, da, dt = display
+    rec = {
+        "Raw": {
+            "Force_lbs": round(rf, 2),
+            "Angle_deg_selected": round(ra, 3),
+            "Torque_Nm": round(rt, 3)
+        },
+        "Angles": {
+            "ToF_deg": {f"S{i+1}": round(val, 3) for i, val in enumerate(tof_angles)},
+            "BNO055": {
+                "roll_deg":  round(float(bno.get("roll",  0.0)), 3),
+                "pitch_deg": round(float(bno.get("pitch", 0.0)), 3),
+                "yaw_deg":   round(float(bno.get("yaw",   0.0)), 3),
+            }
+        },
+        "Display": {
+            "Force_lbs": round(df, 2),
+            "Angle_deg": round(da, 3),
+            "Torque_Nm": round(dt, 3)
+        }
+    }
+    if timing:
+        ts, ta = timing
+        rec["Timing"] = {"Sched_s": round(ts, 4), "Acq_s": round(ta, 4), "Late_ms": round((ta - ts) * 1e3, 3)}
+    return rec
+
+
+# ----- reading a (possibly segmented) session -----
+def manifest_path_for(xml_path: str) -> str:
+    base, _ = os.path.splitext(xml_path)
+    return f"{base}.manifest.json"
+
+def session_segments(xml_path: str) -> list:
+    """Ordered segment files for a session; just [xml_path] if it was never rotated."""
+    mpath = manifest_path_for(xml_path)
+    if not os.path.exists(mpath):
+        return [xml_path]
+    with open(mpath, encoding="utf-8") as f:
+        doc = json.load(f)
+    d = os.path.dirname(os.path.abspath(xml_path))
+    out = []
+    for s in doc.get("segments", []):
+        p = os.path.join(d, s["file"])
+        # a segment may have been gzipped after the manifest was read
+        if not os.path.exists(p) and os.path.exists(p + ".gz"):
+            p += ".gz"
+        if os.path.exists(p):
+            out.append(p)
+    return out
+
+def open_segment(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+def iter_session_roots(xml_path: str):
+    """Yield the <Session> root of every segment in order."""
+    for p in session_segments(xml_path):
+        with open_segment(p) as f:
+            yield ET.parse(f).getroot()
 
 
+# ----- XML → CSV (all rotated segments of the session) -----
+def export_xml_to_csv(xml_path: str) -> str:
+    samples = [s for root in iter_session_roots(xml_path) for s in root.findall(".//Sample")]
+    fields, rows = set(), []
+    for s in samples:
+        row = {}
+        def add(prefix, elem):
+            for c in elem:
+                tag = f"{prefix}.{c.tag}" if prefix else c.tag
+                if len(c):
+                    add(tag, c)
+                else:
+                    row[tag] = (c.text or "").strip(); fields.add(tag)
+        add("", s)
+        row["timestamp"] = s.attrib.get("t", "")
+        rows.append(row)
+    fieldnames = ["timestamp"] + sorted(fields)
+    base, _ = os.path.splitext(xml_path)
+    csv_path = f"{base}.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames); w.writeheader(); w.writerows(rows)
+    return csv_path